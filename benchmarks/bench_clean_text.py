@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: legacy three-pass _clean_text vs text_normalizer.
+
+    python -m benchmarks.bench_clean_text [--mb 50]
+
+Builds a deterministic synthetic corpus (mostly ASCII lecture-style text with
+some accented words, symbols and ragged whitespace), checks that both
+implementations agree, and prints timings.
+"""
+import argparse
+import random
+import re
+import time
+
+from text_normalizer import TextNormalizer, normalize_text
+
+_WORDS = [
+    "lecture", "notes", "the", "of", "photosynthesis", "mitochondria", "(see", "fig.", "3)",
+    "data:", "e-mail", "well-known", "100%", "a/b", "<b>", "\"quote\"", "it's", "x^2",
+    "café", "résumé", "α-helix", "€5", "—", "•", "#tag", "@user", "[1]", "{x}", "f(x);",
+]
+
+
+def legacy_clean_text(text):
+    """The original DocumentProcessor._clean_text."""
+    if not text:
+        return ""
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]", "", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def build_corpus(megabytes, seed=0):
+    rng = random.Random(seed)
+    lines, size, target = [], 0, megabytes * 1024 * 1024
+    while size < target:
+        line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 16)))
+        if rng.random() < 0.15:
+            line += rng.choice(["\n", "\t", "   ", "\r\n"])
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def incremental(text, piece=64 * 1024):
+    normalizer = TextNormalizer()
+    return "".join(normalizer.feed(text[i:i + piece]) for i in range(0, len(text), piece))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=int, default=50, help="corpus size in MB (default 50)")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.mb)
+    ascii_corpus = corpus.encode("ascii", "ignore").decode("ascii")
+    print(f"corpus: {len(corpus) / 1e6:.1f}M chars")
+
+    for label, text in (("mixed", corpus), ("ascii", ascii_corpus)):
+        expected, legacy_seconds = timed(legacy_clean_text, text)
+        result, new_seconds = timed(normalize_text, text)
+        streamed, stream_seconds = timed(incremental, text)
+        assert result == expected and streamed == expected, "normalizer output differs from legacy"
+        print(
+            f"{label:>5}: legacy {legacy_seconds:6.2f}s | normalize_text {new_seconds:6.2f}s "
+            f"({legacy_seconds / new_seconds:4.1f}x) | incremental 64K {stream_seconds:6.2f}s "
+            f"({legacy_seconds / stream_seconds:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: python-docx object model vs the streaming word/document.xml reader.
+
+    python -m benchmarks.bench_docx [--sections 200] [--rows 20] [--cols 5]
+
+Builds table-heavy "lab manual" documents (merged header rows and a
+vertically merged first column, the worst case for row.cells), runs both
+extractors on the same bytes and prints time, peak Python heap (tracemalloc;
+lxml's C-side tree used by python-docx is not counted) and output size.
+Duplicated text in the python-docx output shows up as extra characters.
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_docx
+from document_processor import DocumentProcessor
+
+
+def measure(func, data):
+    tracemalloc.start()
+    started = time.perf_counter()
+    content = func(data)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return content, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=200, help="paragraph + table blocks (default 200)")
+    parser.add_argument("--rows", type=int, default=20, help="rows per table (default 20)")
+    parser.add_argument("--cols", type=int, default=5, help="columns per table (default 5)")
+    args = parser.parse_args()
+
+    processor = DocumentProcessor(pdf_workers=1)
+    legacy = lambda data: processor._join_cleaned(processor._iter_word_units_python_docx(data))
+    streaming = lambda data: processor._join_cleaned(processor._iter_word_units(data))
+
+    for merged in (False, True):
+        data = make_docx(args.sections, rows=args.rows, cols=args.cols, merged=merged)
+        label = "merged" if merged else "plain"
+        print(f"{label}: {len(data) / 1024:.0f} KB docx, {args.sections} tables of {args.rows}x{args.cols}")
+
+        old, old_seconds, old_peak = measure(legacy, data)
+        new, new_seconds, new_peak = measure(streaming, data)
+        assert set(new.split()) == set(old.split()), "streaming reader lost or invented words"
+        for name, content, seconds, peak in (
+            ("python-docx", old, old_seconds, old_peak),
+            ("streaming", new, new_seconds, new_peak),
+        ):
+            print(f"  {name:>11}: {seconds:6.2f}s  peak {peak / 1e6:7.1f} MB  {len(content):>10,} chars")
+        print(f"  speedup {old_seconds / new_seconds:.1f}x, memory {old_peak / max(new_peak, 1):.1f}x less")
+
+
+if __name__ == "__main__":
+    main()
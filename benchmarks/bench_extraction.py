@@ -0,0 +1,168 @@
+"""
+Benchmark suite for DocumentProcessor.process_document.
+
+    python -m benchmarks.bench_extraction                      # run and print
+    python -m benchmarks.bench_extraction --save-baseline base.json
+    python -m benchmarks.bench_extraction --baseline base.json --threshold 0.25
+
+Generates synthetic PDF, DOCX (with tables), TXT and text-image files in
+small/medium/large size classes, then extracts each one in a fresh
+subprocess (serial extraction, no cache) so that peak RSS belongs to that
+case alone. Reports the median time over --repeat runs and the peak RSS.
+
+With --baseline, any case slower than baseline * (1 + threshold) or using
+more than baseline RSS * (1 + rss-threshold) is reported and the exit code is 1.
+Everything runs offline; image cases are skipped when Tesseract is missing.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+
+# (format, size class) -> how to build the file
+CASES = {
+    ("pdf", "small"): lambda: synthetic.make_pdf(synthetic.make_pdf_pages(5)),
+    ("pdf", "medium"): lambda: synthetic.make_pdf(synthetic.make_pdf_pages(50)),
+    ("pdf", "large"): lambda: synthetic.make_pdf(synthetic.make_pdf_pages(300)),
+    ("docx", "small"): lambda: synthetic.make_docx(sections=5),
+    ("docx", "medium"): lambda: synthetic.make_docx(sections=50),
+    ("docx", "large"): lambda: synthetic.make_docx(sections=300),
+    ("txt", "small"): lambda: synthetic.make_txt(100 * 1024),
+    ("txt", "medium"): lambda: synthetic.make_txt(5 * 1024 * 1024),
+    ("txt", "large"): lambda: synthetic.make_txt(50 * 1024 * 1024),
+    ("png", "small"): lambda: synthetic.make_text_image(800, 600),
+    ("png", "medium"): lambda: synthetic.make_text_image(1600, 1200),
+    ("png", "large"): lambda: synthetic.make_text_image(3200, 2400),
+}
+
+FORMATS = ["pdf", "docx", "txt", "png"]
+SIZES = ["small", "medium", "large"]
+
+
+def tesseract_available():
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def run_case(path, repeat, pdf_backend):
+    """Child process: extract path `repeat` times and print a JSON result."""
+    import resource  # Unix only, like ru_maxrss below
+
+    from document_processor import DocumentProcessor, is_status_marker
+
+    processor = DocumentProcessor(pdf_workers=1, pdf_backend=pdf_backend)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        content = processor.process_document(path)
+        timings.append(time.perf_counter() - started)
+
+    # ru_maxrss is KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "seconds": statistics.median(timings),
+        "peak_rss_mb": peak_mb,
+        "chars": len(content),
+        "ok": not is_status_marker(content),
+        "pdf_backend": processor.pdf_backends[0],
+    }))
+
+
+def measure(path, repeat, pdf_backend):
+    command = [sys.executable, "-m", "benchmarks.bench_extraction", "--run-case", path, "--repeat", str(repeat)]
+    if pdf_backend:
+        command += ["--pdf-backend", pdf_backend]
+    completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold, rss_threshold):
+    """Regression messages for cases that got slower or bigger than the baseline allows."""
+    regressions = []
+    for case, result in results.items():
+        before = baseline.get("cases", {}).get(case)
+        if not before:
+            continue
+        if result["seconds"] > before["seconds"] * (1 + threshold):
+            regressions.append(
+                f"{case}: {result['seconds']:.3f}s vs baseline {before['seconds']:.3f}s "
+                f"({result['seconds'] / before['seconds'] - 1:+.0%}, limit {threshold:+.0%})"
+            )
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + rss_threshold):
+            regressions.append(
+                f"{case}: peak RSS {result['peak_rss_mb']:.0f} MB vs baseline {before['peak_rss_mb']:.0f} MB "
+                f"(limit {rss_threshold:+.0%})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated subset of pdf,docx,txt,png")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma-separated subset of small,medium,large")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the median is reported (default 3)")
+    parser.add_argument("--pdf-backend", default=None, help="PDF backend to benchmark (default: auto)")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (default 0.25)")
+    parser.add_argument("--rss-threshold", type=float, default=0.25, help="allowed peak RSS growth (default 0.25)")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(args.run_case, args.repeat, args.pdf_backend)
+        return 0
+
+    formats = [name for name in args.formats.split(",") if name]
+    sizes = [name for name in args.sizes.split(",") if name]
+    if "png" in formats and not tesseract_available():
+        print("Tesseract not found: skipping image cases")
+        formats.remove("png")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="lb-bench-") as folder:
+        for file_format in formats:
+            for size in sizes:
+                case = f"{file_format}/{size}"
+                path = os.path.join(folder, f"{file_format}-{size}.{file_format}")
+                with open(path, "wb") as file:
+                    file.write(CASES[(file_format, size)]())
+                result = measure(path, args.repeat, args.pdf_backend)
+                result["bytes"] = os.path.getsize(path)
+                results[case] = result
+                print(
+                    f"{case:>12}: {result['seconds']:8.3f}s  {result['bytes'] / (1024 * 1024) / result['seconds']:8.1f} MB/s  "
+                    f"peak RSS {result['peak_rss_mb']:7.1f} MB  {result['chars']:>11,} chars"
+                    + ("" if result["ok"] else "  [extraction failed]")
+                )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump({"python": sys.version.split()[0], "cases": results}, file, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold, args.rss_threshold)
+        if regressions:
+            print("\nRegressions:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
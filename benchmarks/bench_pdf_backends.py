@@ -0,0 +1,116 @@
+"""
+Benchmark: PDF text backends (PyPDF2, pypdfium2, pdfminer.six).
+
+    python -m benchmarks.bench_pdf_backends [PDF or folder ...] [--pages 100] [--reference pdfminer]
+
+Reports pages/sec and text fidelity per installed backend. Fidelity is the
+token F1 of each page against a reference: the known text for the built-in
+synthetic PDF, or the --reference backend's output for real files (so it
+measures agreement, not ground truth, on a corpus).
+"""
+import argparse
+import os
+import re
+import time
+from collections import Counter
+
+from benchmarks.synthetic import make_pdf, make_pdf_pages
+from pdf_backends import BACKENDS, available_backends
+
+_TOKEN = re.compile(r"\w+")
+
+
+def token_f1(text, reference):
+    """Bag-of-words F1 between extracted text and the reference text."""
+    found, expected = Counter(_TOKEN.findall(text.lower())), Counter(_TOKEN.findall(reference.lower()))
+    if not found and not expected:
+        return 1.0
+    overlap = sum((found & expected).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(found.values()), overlap / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def extract_pages(backend, source):
+    """Page texts of source with one backend, or None for pages that failed."""
+    document = BACKENDS[backend](source)
+    try:
+        texts = []
+        for index in range(len(document)):
+            try:
+                texts.append(document.page_text(index))
+            except Exception:
+                texts.append(None)
+        return texts
+    finally:
+        document.close()
+
+
+def find_pdfs(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, filenames in os.walk(path):
+                found.extend(os.path.join(folder, name) for name in filenames if name.lower().endswith(".pdf"))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="PDF files or folders (default: a synthetic PDF)")
+    parser.add_argument("--pages", type=int, default=100, help="pages in the synthetic PDF (default 100)")
+    parser.add_argument("--reference", default="pdfminer", help="reference backend for real files (default pdfminer)")
+    args = parser.parse_args()
+
+    backends = available_backends()
+    if args.paths:
+        reference = args.reference if args.reference in backends else "pypdf2"
+        corpus = [(path, None) for path in find_pdfs(args.paths)]
+        print(f"{len(corpus)} PDFs, fidelity vs {reference}")
+    else:
+        reference = None
+        page_texts = make_pdf_pages(args.pages)
+        corpus = [(make_pdf(page_texts), page_texts)]
+        print(f"synthetic PDF, {args.pages} pages, fidelity vs known text")
+    print(f"backends: {', '.join(backends)}\n")
+
+    results = {}
+    for backend in backends:
+        pages = failures = 0
+        seconds = 0.0
+        outputs = []
+        for source, _ in corpus:
+            started = time.perf_counter()
+            try:
+                texts = extract_pages(backend, source)
+            except Exception:
+                texts = None
+            seconds += time.perf_counter() - started
+            outputs.append(texts)
+            if texts is not None:
+                pages += len(texts)
+                failures += sum(text is None for text in texts)
+        results[backend] = (pages, failures, seconds, outputs)
+
+    for backend in backends:
+        pages, failures, seconds, outputs = results[backend]
+        scores = []
+        for index, (source, truth) in enumerate(corpus):
+            expected = truth if truth is not None else results[reference][3][index]
+            if outputs[index] is None or expected is None:
+                continue
+            for text, reference_text in zip(outputs[index], expected):
+                if text is not None and reference_text is not None:
+                    scores.append(token_f1(text, reference_text))
+        fidelity = sum(scores) / len(scores) if scores else 0.0
+        print(
+            f"{backend:>10}: {pages / max(seconds, 1e-9):8.1f} pages/sec  "
+            f"F1 {fidelity:.3f}  {failures} failed pages  ({seconds:.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
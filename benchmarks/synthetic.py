@@ -0,0 +1,176 @@
+"""
+Deterministic synthetic documents for the benchmarks.
+
+Files are written as raw bytes (no python-docx / PDF library needed to build
+them), so generating large inputs is fast and does not depend on the code
+being measured.
+"""
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+WORDS = [
+    "lecture", "experiment", "sample", "buffer", "solution", "the", "of", "measure", "record",
+    "temperature", "pressure", "volume", "enzyme", "reaction", "rate", "control", "observe",
+    "procedure", "safety", "goggles", "pipette", "beaker", "café", "résumé", "α-helix", "pH",
+]
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCUMENT_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+_DOCUMENT_CLOSE = '<w:sectPr/></w:body></w:document>'
+
+
+def sentence(rng, low=6, high=18):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def _paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def _cell(text, span=1, vmerge=None):
+    properties = ""
+    if span > 1:
+        properties += f'<w:gridSpan w:val="{span}"/>'
+    if vmerge:
+        properties += '<w:vMerge w:val="restart"/>' if vmerge == "restart" else "<w:vMerge/>"
+    properties = f"<w:tcPr>{properties}</w:tcPr>" if properties else ""
+    return f"<w:tc>{properties}{_paragraph(text)}</w:tc>"
+
+
+def _table(rng, rows, cols, merged):
+    """A lab-manual style table; with merged=True the first column is one
+    vertically merged cell and the header row spans the whole width."""
+    parts = [f"<w:tbl><w:tblGrid>{'<w:gridCol/>' * cols}</w:tblGrid>"]
+    if merged:
+        parts.append(f"<w:tr>{_cell('Step ' + sentence(rng, 2, 4), span=cols)}</w:tr>")
+    for row in range(rows):
+        cells = []
+        for col in range(cols):
+            if merged and col == 0:
+                cells.append(_cell(sentence(rng, 2, 5), vmerge="restart") if row == 0 else _cell("", vmerge="continue"))
+            else:
+                cells.append(_cell(sentence(rng, 2, 8)))
+        parts.append(f"<w:tr>{''.join(cells)}</w:tr>")
+    parts.append("</w:tbl>")
+    return "".join(parts)
+
+
+def make_docx(sections=50, paragraphs=4, rows=20, cols=5, merged=True, seed=0):
+    """DOCX bytes: `sections` blocks of text paragraphs each followed by a table."""
+    rng = random.Random(seed)
+    body = []
+    for _ in range(sections):
+        body.extend(_paragraph(sentence(rng)) for _ in range(paragraphs))
+        body.append(_table(rng, rows, cols, merged))
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _RELS)
+        archive.writestr("word/document.xml", _DOCUMENT_OPEN + "".join(body) + _DOCUMENT_CLOSE)
+    return buffer.getvalue()
+
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf_pages(pages=50, lines=40, seed=0):
+    """Page texts for make_pdf: `lines` sentences per page (ASCII, Helvetica-safe)."""
+    rng = random.Random(seed)
+    words = [word for word in WORDS if word.isascii()]
+    return [
+        "\n".join(" ".join(rng.choice(words) for _ in range(rng.randint(5, 12))) for _ in range(lines))
+        for _ in range(pages)
+    ]
+
+
+def make_pdf(page_texts):
+    """Minimal PDF bytes with one text line per "\\n"-separated line of each page."""
+    count = len(page_texts)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(count))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, text in enumerate(page_texts):
+        operations, y = [], 760
+        for line in text.split("\n"):
+            if line:
+                operations.append(f"BT /F1 10 Tf 40 {y} Td ({_pdf_string(line)}) Tj ET")
+            y -= 13
+        stream = "\n".join(operations).encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def make_txt(size_bytes, seed=0):
+    """UTF-8 lecture notes of about size_bytes: paragraphs, blank lines, form feeds."""
+    rng = random.Random(seed)
+    lines, size = [], 0
+    while size < size_bytes:
+        line = sentence(rng)
+        if rng.random() < 0.1:
+            line += "\n"
+        if rng.random() < 0.002:
+            line += "\f"
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+    return "\n".join(lines).encode("utf-8")
+
+
+def make_text_image(width=1600, height=1200, seed=0):
+    """PNG bytes of black sentences on a white page, like a photographed handout."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:  # Pillow < 10.1 only has the small bitmap font
+        font = ImageFont.load_default()
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    words = [word for word in WORDS if word.isascii()]
+    for y in range(40, height - 40, 40):
+        draw.text((40, y), " ".join(rng.choice(words) for _ in range(max(1, width // 140))), fill=0, font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
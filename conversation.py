@@ -0,0 +1,174 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from retrieval import CHARS_PER_TOKEN, estimate_tokens
+from summarizer import summarize
+
+
+# Chat formatting overhead per message (role markers etc.), in tokens
+_MESSAGE_OVERHEAD = 4
+
+# Longest transcript handed to summarize_fn in one refresh; longer backlogs
+# (e.g. the first refresh of a long session) are shrunk extractively first
+_MAX_REFRESH_CHARS = 12000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _summary_executor():
+    """Small shared pool for background summary refreshes (created on first use)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="conversation-summary")
+    return _executor
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + _MESSAGE_OVERHEAD
+
+
+def transcript(messages):
+    """Plain-text "User: ... / Assistant: ..." rendering of chat messages."""
+    return "\n".join(f"{message['role'].capitalize()}: {message['content']}" for message in messages)
+
+
+class ConversationBuilder:
+    """
+    Builds the message list for one chat request within a token budget.
+
+    - The system prompt and the new user turn always go in.
+    - The most recent turns go in verbatim while they fit recent_budget.
+    - Older turns are folded into a rolling summary appended to the system
+      prompt. summarize_fn(previous_summary, transcript) (e.g. an LLM call)
+      refreshes it in a background thread; until that finishes, an
+      extractive summary (summarizer.summarize) stands in, so a request
+      never waits for summarization.
+
+    One builder per chat session; last_request and totals report the
+    estimated prompt size against sending the whole history.
+    """
+
+    def __init__(self, token_budget=4000, recent_budget=1500, summary_tokens=250, summarize_fn=None):
+        self.token_budget = token_budget
+        self.recent_budget = recent_budget
+        self.summary_tokens = summary_tokens
+        self.summarize_fn = summarize_fn
+
+        self.summary = ""            # covers history[:summarized_turns]
+        self.summary_source = None   # "llm" or "extractive"
+        self.summarized_turns = 0
+        self._future = None
+        self._refreshing_turns = 0   # turns the running refresh will cover
+        self.last_request = None
+        self.totals = {"requests": 0, "prompt_tokens": 0, "full_tokens": 0}
+
+    def reset(self):
+        self.summary = ""
+        self.summary_source = None
+        self.summarized_turns = 0
+        self._future = None
+        self._refreshing_turns = 0
+
+    def build(self, system_prompt, history, user_input):
+        """
+        Messages for a request: system prompt (+ summary of older turns),
+        recent history verbatim, then user_input. history holds earlier
+        {"role", "content"} turns, oldest first, without the new turn.
+        """
+        if len(history) < max(self.summarized_turns, self._refreshing_turns):
+            self.reset()  # chat was cleared
+        self._collect_summary()
+
+        fixed = estimate_tokens(system_prompt) + estimate_tokens(user_input) + 2 * _MESSAGE_OVERHEAD
+        recent_budget = max(0, min(self.recent_budget, self.token_budget - fixed - self.summary_tokens))
+
+        # Newest turns first while they fit; everything before `split` is summarized
+        split, used = len(history), 0
+        while split > 0 and used + message_tokens(history[split - 1]) <= recent_budget:
+            split -= 1
+            used += message_tokens(history[split])
+        split = max(split, self.summarized_turns)
+
+        summary, source = self._summary_for(history, split)
+        if summary:
+            system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend({"role": message["role"], "content": message["content"]} for message in history[split:])
+        messages.append({"role": "user", "content": user_input})
+
+        prompt_tokens = sum(message_tokens(message) for message in messages)
+        full_tokens = fixed + sum(message_tokens(message) for message in history)
+        self.last_request = {
+            "prompt_tokens": prompt_tokens,
+            "full_tokens": full_tokens,
+            "verbatim_turns": len(history) - split,
+            "summarized_turns": split,
+            "summary": source,
+        }
+        self.totals["requests"] += 1
+        self.totals["prompt_tokens"] += prompt_tokens
+        self.totals["full_tokens"] += full_tokens
+        return messages
+
+    # ------------------------
+    # Rolling summary
+    # ------------------------
+
+    def _summary_for(self, history, split):
+        """
+        (summary of history[:split], source), starting a background refresh
+        when the stored summary is behind.
+        """
+        if split == 0:
+            return "", None
+        if split <= self.summarized_turns:
+            return self.summary, self.summary_source
+
+        max_chars = self.summary_tokens * CHARS_PER_TOKEN
+        new_turns = transcript(history[self.summarized_turns:split])
+        if self.summarize_fn is None:
+            # No background summarizer: roll the extractive summary forward
+            self.summary = summarize(f"{self.summary}\n{new_turns}".strip(), max_length=max_chars)
+            self.summary_source = "extractive"
+            self.summarized_turns = split
+            return self.summary, self.summary_source
+
+        if self._future is None:
+            if len(new_turns) > _MAX_REFRESH_CHARS:
+                new_turns = summarize(new_turns, max_length=_MAX_REFRESH_CHARS)
+            self._future = _summary_executor().submit(self._refresh, self.summary, new_turns, split)
+            self._refreshing_turns = split
+        # Until the refresh lands, the turns it will cover get an extractive stand-in
+        room = max(max_chars - len(self.summary), max_chars // 3)
+        source = "llm+extractive" if self.summary_source == "llm" else "extractive"
+        return f"{self.summary}\n{summarize(new_turns, max_length=room)}".strip(), source
+
+    def _refresh(self, previous_summary, new_turns, covered):
+        return covered, self.summarize_fn(previous_summary, new_turns)
+
+    def _collect_summary(self):
+        """Adopt a finished background summary if it covers more than the stored one."""
+        future = self._future
+        if future is None or not future.done():
+            return
+        self._future = None
+        self._refreshing_turns = 0
+        try:
+            covered, text = future.result()
+        except Exception:
+            return  # keep the old summary; the next build retries
+        if text and covered > self.summarized_turns:
+            max_chars = self.summary_tokens * CHARS_PER_TOKEN
+            self.summary = text if len(text) <= max_chars else summarize(text, max_length=max_chars)
+            self.summary_source = "llm"
+            self.summarized_turns = covered
+
+    def stats(self):
+        """Totals plus the share of tokens saved against sending the full history."""
+        stats = dict(self.totals)
+        stats["saved"] = 1 - stats["prompt_tokens"] / stats["full_tokens"] if stats["full_tokens"] else 0.0
+        return stats
@@ -0,0 +1,153 @@
+import re
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+
+# One cleaned piece of a document; start/end index into process_document's
+# output. kind is "text" or a heading level "h1".."h9".
+TextChunk = namedtuple("TextChunk", ["text", "page", "start", "end", "kind"], defaults=("text",))
+
+# "1 Introduction", "2.3 Results", "Chapter 4", "Lecture 7: ..."
+_NUMBERED_HEADING = re.compile(
+    r"^(?:(?:chapter|section|part|unit|lecture|module|week|lab)\s+\d+\b|(\d+(?:\.\d+)*)\.?\s+\S)",
+    re.IGNORECASE,
+)
+
+
+def heading_kind(text):
+    """
+    Guess whether a short standalone paragraph is a heading (for formats
+    without styles, i.e. PDF and TXT). Returns "h1".."h9" or "text".
+    """
+    words = text.split()
+    if not words or len(words) > 12 or len(text) > 100 or text[-1] in ".,;!?" or not text[0].isalnum():
+        return "text"
+
+    numbered = _NUMBERED_HEADING.match(text)
+    if numbered:
+        number = numbered.group(1)
+        return f"h{min(9, number.count('.') + 1)}" if number else "h1"
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) >= 4 and all(char.isupper() for char in letters):
+        return "h1"
+    capitalized = sum(word[0].isupper() for word in words if len(word) > 3)
+    if len(words) >= 2 and capitalized == sum(len(word) > 3 for word in words) and text[0].isupper():
+        return "h2"
+    return "text"
+
+
+class StructuredDocument:
+    """
+    Cleaned document text plus page, paragraph and heading offsets.
+
+    text is exactly what process_document returns (without any truncation
+    marker). Structure is kept in flat integer arrays rather than one object
+    per paragraph, so a 1,000-page document costs a few bytes per paragraph
+    on top of its text. Offsets are character positions in text.
+    """
+
+    __slots__ = (
+        "text", "truncated",
+        "page_numbers", "page_starts",
+        "paragraph_starts", "paragraph_ends", "paragraph_pages",
+        "heading_paragraphs", "heading_levels",
+    )
+
+    def __init__(self, text="", truncated=None):
+        self.text = text
+        self.truncated = truncated
+        self.page_numbers = array("l")      # page number of each page run
+        self.page_starts = array("q")       # offset where that page run starts
+        self.paragraph_starts = array("q")
+        self.paragraph_ends = array("q")
+        self.paragraph_pages = array("l")   # 0 when the format has no pages
+        self.heading_paragraphs = array("l")  # paragraph index of each heading
+        self.heading_levels = array("b")
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build from TextChunks as produced by DocumentProcessor.iter_chunks."""
+        document = cls()
+        texts = []
+        for chunk in chunks:
+            texts.append(chunk.text)
+            page = chunk.page or 0
+            if chunk.page is not None and (not document.page_numbers or document.page_numbers[-1] != page):
+                document.page_numbers.append(page)
+                document.page_starts.append(chunk.start)
+            if chunk.kind != "text":
+                document.heading_paragraphs.append(len(document.paragraph_starts))
+                document.heading_levels.append(int(chunk.kind[1:]))
+            document.paragraph_starts.append(chunk.start)
+            document.paragraph_ends.append(chunk.end)
+            document.paragraph_pages.append(page)
+        document.text = " ".join(texts)
+        return document
+
+    def __len__(self):
+        return len(self.text)
+
+    def __repr__(self):
+        return (
+            f"StructuredDocument({len(self.text):,} chars, {len(self.page_numbers)} pages, "
+            f"{len(self.paragraph_starts)} paragraphs, {len(self.heading_paragraphs)} headings)"
+        )
+
+    # ------------------------
+    # Navigation
+    # ------------------------
+
+    def page_at(self, offset):
+        """Page number containing offset, or None for page-less formats."""
+        index = bisect_right(self.page_starts, offset) - 1
+        return self.page_numbers[index] if index >= 0 else None
+
+    def paragraph_at(self, offset):
+        """Index of the paragraph containing (or preceding) offset, or -1."""
+        return bisect_right(self.paragraph_starts, offset) - 1
+
+    def heading_at(self, offset):
+        """Text of the nearest heading at or before offset, or None."""
+        paragraph = self.paragraph_at(offset)
+        index = bisect_right(self.heading_paragraphs, paragraph) - 1
+        if index < 0:
+            return None
+        heading = self.heading_paragraphs[index]
+        return self.text[self.paragraph_starts[heading]:self.paragraph_ends[heading]]
+
+    def cite(self, start, end=None):
+        """Human-readable location of a span, e.g. 'p. 4-5, "2.1 Enzymes"'."""
+        parts = []
+        first = self.page_at(start)
+        if first is not None:
+            last = self.page_at(max(start, (end or start) - 1))
+            parts.append(f"p. {first}" if last in (None, first) else f"p. {first}-{last}")
+        heading = self.heading_at(start)
+        if heading:
+            parts.append(f'"{heading}"')
+        return ", ".join(parts)
+
+    # ------------------------
+    # Iteration
+    # ------------------------
+
+    def pages(self):
+        """Yield (page_number, start, end) for each page run."""
+        for index, number in enumerate(self.page_numbers):
+            end = self.page_starts[index + 1] - 1 if index + 1 < len(self.page_starts) else len(self.text)
+            yield number, self.page_starts[index], end
+
+    def paragraphs(self):
+        """Yield a TextChunk per paragraph (text is sliced on demand)."""
+        headings = dict(zip(self.heading_paragraphs, self.heading_levels))
+        for index, (start, end) in enumerate(zip(self.paragraph_starts, self.paragraph_ends)):
+            page = self.paragraph_pages[index] or None
+            kind = f"h{headings[index]}" if index in headings else "text"
+            yield TextChunk(self.text[start:end], page, start, end, kind)
+
+    def headings(self):
+        """Yield (level, text, start, page) for every heading in order."""
+        for paragraph, level in zip(self.heading_paragraphs, self.heading_levels):
+            start, end = self.paragraph_starts[paragraph], self.paragraph_ends[paragraph]
+            yield level, self.text[start:end], start, self.paragraph_pages[paragraph] or None
@@ -1,9 +1,32 @@
+import io
 import os
+import codecs
+import mmap
 import re
+import time
+import hashlib
+import tempfile
+import threading
+import zipfile
+import xml.etree.ElementTree as ElementTree
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import PyPDF2
 from docx import Document
-from PIL import Image
+from PIL import Image, ImageOps
 import pytesseract
+from text_normalizer import normalize_text
+from summarizer import summarize
+from pdf_backends import PdfTextReader, resolve_backends
+from document_model import StructuredDocument, TextChunk, heading_kind
+
+# Optional: pypdfium2 renders scanned pages for OCR; without it we OCR the
+# images embedded in the page instead (the common case for scanner output)
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
 
 
 # ✅ Configurable Tesseract OCR path with fallbacks
@@ -21,137 +44,1213 @@ except Exception:
     pass
 
 
+# Bump whenever extraction output changes so stale cache entries are ignored
+EXTRACTOR_VERSION = "4"
+
+
+def make_cache_key(digest, file_extension, version=EXTRACTOR_VERSION):
+    """Extraction cache key: SHA-256 of the file bytes + extractor version + file type."""
+    return f"{digest}:{version}:{file_extension}"
+
+
+class StatusMarker(str):
+    """
+    Status text returned in place of document text, e.g. '[Error reading PDF: ...]'.
+    The type marks it, not the brackets: real text may start with "[" and
+    end with "]" (slide labels, citations, a truncation marker).
+    """
+
+
+def is_status_marker(content):
+    """True for empty output or a StatusMarker."""
+    return not content or isinstance(content, StatusMarker)
+
+
+# Upload MIME types (e.g. Streamlit UploadedFile.type) we know how to extract
+_MIME_TYPES = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "application/msword": ".doc",
+    "text/plain": ".txt",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+}
+
+# Filename extensions detect_file_type trusts without looking at the bytes
+_KNOWN_EXTENSIONS = set(_MIME_TYPES.values()) | {".jpeg"}
+
+# Little-endian DIB header sizes that follow a real BMP file header ("BM" alone is common in text)
+_BMP_HEADER_SIZES = {size.to_bytes(4, "little") for size in (12, 40, 52, 56, 64, 108, 124)}
+
+# Outcome of one file in process_documents; ok is False for error/empty markers
+DocumentResult = namedtuple("DocumentResult", ["source", "content", "ok", "seconds", "size"])
+
+# Blank lines separate paragraphs inside a page of extracted text
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# In-memory PDFs larger than this are written to a temp file once before their
+# scanned pages go to the OCR pool, instead of being pickled with every page
+_OCR_SPILL_BYTES = 4 * 1024 * 1024
+
+# Upper bound for one streamed unit of page-less text (TXT without form feeds)
+_MAX_UNIT_CHARS = 64 * 1024
+
+# A list item starts a new PDF paragraph
+_BULLET_LINE = re.compile(r"^(?:[\u2022\u25aa\u25e6\u00b7*\-\u2013]|\(?\d{1,2}[.)]|\(?[a-z][.)])\s")
+
+
+def _pdf_paragraphs(text):
+    """
+    Split the text of one PDF page into paragraphs. PDF text layers have
+    line breaks but rarely blank lines, so a paragraph also ends before a
+    short standalone title-like line (kept on its own so heading_kind can
+    see it), before a list item, and after a sentence that ends well short
+    of the page's usual line width.
+    """
+    for block in _PARAGRAPH_BREAK.split(text):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        if not lines:
+            continue
+        width = sorted(len(line) for line in lines)[len(lines) * 3 // 4]
+        paragraph = []
+        for line in lines:
+            standalone = not paragraph or paragraph[-1][-1] in ".!?:"
+            if standalone and len(line) <= 0.75 * width and heading_kind(line) != "text":
+                if paragraph:
+                    yield "\n".join(paragraph)
+                    paragraph = []
+                yield line
+                continue
+            if paragraph and _BULLET_LINE.match(line):
+                yield "\n".join(paragraph)
+                paragraph = []
+            paragraph.append(line)
+            if line[-1] in ".!?:" and len(line) < 0.8 * width:
+                yield "\n".join(paragraph)
+                paragraph = []
+        if paragraph:
+            yield "\n".join(paragraph)
+
+
+def _spill_to_temp_file(data, suffix):
+    """Write in-memory file bytes to a private temp file and return its path (caller deletes it)."""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as file:
+        file.write(data)
+        return file.name
+
+
+def _open_source(source):
+    """Binary file object for a path or for in-memory file bytes."""
+    if isinstance(source, str):
+        return open(source, "rb")
+    return io.BytesIO(source)
+
+
+def detect_file_type(data, filename=None, mime_type=None):
+    """
+    Extension-style type key (".pdf", ".docx", ".png", ...) for in-memory file bytes.
+    A supported filename extension wins, then the MIME type; magic bytes are
+    only sniffed when neither names a supported type (a "notes.txt" that
+    starts with "BM..." stays text, an upload without a name still works).
+    """
+    extension = os.path.splitext(filename)[1].lower() if filename else ""
+    if extension in _KNOWN_EXTENSIONS:
+        return extension
+    if mime_type in _MIME_TYPES:
+        return _MIME_TYPES[mime_type]
+
+    head = data[:1024]
+    sniffed = _sniff_file_type(data, head)
+    if sniffed:
+        return sniffed
+    if extension:
+        return extension
+    if b"\x00" not in head or head.startswith(_TEXT_BOMS) or _utf16_byte_order(head):
+        return ".txt"
+    return ""
+
+
+def _sniff_file_type(data, head):
+    """Type key from magic bytes, or "" when they match no supported format."""
+    if b"%PDF-" in head:
+        return ".pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    if head.startswith(b"BM") and head[14:18] in _BMP_HEADER_SIZES:
+        return ".bmp"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return ".doc"  # legacy OLE2 Word file
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return ".docx"
+        except zipfile.BadZipFile:
+            pass
+    return ""
+
+
+def _extract_pdf_page_range(source, start, stop, backends=None):
+    """Process-pool worker: extract text of pages [start, stop) from a PDF."""
+    with PdfTextReader(source, backends) as reader:
+        return list(reader.iter_pages(start, stop))
+
+
+# WordprocessingML elements that become characters in the extracted text
+_DOCX_INLINE = {"tab": "\t", "br": "\n", "cr": "\n", "noBreakHyphen": "-", "softHyphen": ""}
+
+# Paragraph styles treated as headings: "Title", "Heading1".."Heading9"
+# (style ids in document.xml) or "Heading 1" (python-docx style names)
+_HEADING_STYLE = re.compile(r"^(?:title|heading\s*([1-9]))$", re.IGNORECASE)
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _heading_kind_for_style(style):
+    """TextChunk kind for a Word paragraph style: "h1".."h9" or "text"."""
+    match = _HEADING_STYLE.match(style or "")
+    if not match:
+        return "text"
+    return f"h{match.group(1) or 1}"
+
+
+def _iter_docx_xml(source):
+    """
+    Stream word/document.xml and yield (None, text) in document order: one
+    unit per paragraph outside tables and one per table cell. Paragraphs
+    with a heading style are yielded as (None, text, "h1".."h9").
+
+    Elements are discarded as soon as they are read, so memory stays flat
+    however long the document is. Cells are taken as stored (a merged cell is
+    a single <w:tc>), so merged cells are not repeated the way python-docx's
+    row.cells repeats them. Text boxes become their own units, and
+    compatibility fallbacks (mc:Fallback) are skipped so they are not read twice.
+    """
+    with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+        with archive.open("word/document.xml") as xml:
+            paragraphs = []  # text pieces of each open paragraph (nested for text boxes)
+            styles = []      # heading kind of each open paragraph
+            cells = []       # paragraph texts of each open table cell (nested for inner tables)
+            depth, skip, body = 0, 0, None
+
+            for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+                name = _local_name(element.tag)
+                if event == "start":
+                    depth += 1
+                    if name == "Fallback":
+                        skip += 1
+                    elif skip:
+                        continue
+                    elif name == "p":
+                        paragraphs.append([])
+                        styles.append("text")
+                    elif name == "tc":
+                        # Text before an inner table stays ahead of the inner cells
+                        if cells and cells[-1]:
+                            yield None, "\n".join(cells[-1])
+                            cells[-1] = []
+                        cells.append([])
+                    elif name == "body":
+                        body = element
+                    continue
+
+                depth -= 1
+                if name == "Fallback":
+                    skip -= 1
+                elif not skip:
+                    if name == "t" and paragraphs:
+                        paragraphs[-1].append(element.text or "")
+                    elif name in _DOCX_INLINE and paragraphs:
+                        paragraphs[-1].append(_DOCX_INLINE[name])
+                    elif name == "pStyle" and styles:
+                        style = next((value for key, value in element.attrib.items() if _local_name(key) == "val"), "")
+                        styles[-1] = _heading_kind_for_style(style)
+                    elif name == "p" and paragraphs:
+                        text, kind = "".join(paragraphs.pop()), styles.pop()
+                        if cells:
+                            cells[-1].append(text)
+                        elif kind != "text":
+                            yield None, text, kind
+                        else:
+                            yield None, text
+                    elif name == "tc" and cells:
+                        texts = cells.pop()
+                        if texts:
+                            yield None, "\n".join(texts)
+
+                # Drop finished content: paragraphs and rows right away (long
+                # tables), everything else once its top-level block ends
+                if name in ("p", "tr"):
+                    element.clear()
+                if depth == 2 and body is not None:
+                    body.clear()
+
+
+# OCR preprocessing: Tesseract is most accurate around 300 DPI; larger inputs
+# only cost time. Images above _OCR_TILE_PIXELS are OCR'd as parallel strips.
+_OCR_TARGET_DPI = 300
+_OCR_MAX_SIDE = 3000
+_OCR_TILE_PIXELS = 3_000_000
+_OCR_MARGIN = 12
+
+
+def _otsu_threshold(histogram):
+    """Threshold maximizing between-class variance of a 256-bin histogram."""
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    weight_bg, sum_bg = 0, 0
+    best, threshold = -1.0, 127
+    for i, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += i * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (weighted_total - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def _prepare_for_ocr(img, max_side=_OCR_MAX_SIDE):
+    """Downsample, grayscale, binarize and crop an image before OCR."""
+    dpi = float(img.info.get("dpi", (0, 0))[0] or 0)
+    scale = min(1.0, max_side / max(img.size), _OCR_TARGET_DPI / dpi if dpi > _OCR_TARGET_DPI else 1.0)
+    target_side = max(1, int(max(img.size) * scale))
+
+    # Let the JPEG decoder downscale in the DCT domain before decoding pixels
+    if scale < 1.0 and img.format == "JPEG":
+        img.draft("L", (int(img.width * scale), int(img.height * scale)))
+
+    img = ImageOps.exif_transpose(img)  # phone photos are often stored sideways
+    gray = img.convert("L")
+    if max(gray.size) > target_side:
+        # draft() only shrinks by powers of two; finish with a proper resample
+        ratio = target_side / max(gray.size)
+        gray = gray.resize((max(1, int(gray.width * ratio)), max(1, int(gray.height * ratio))), Image.LANCZOS)
+
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+    threshold = _otsu_threshold(gray.histogram())
+    binary = gray.point(lambda value: 255 if value > threshold else 0, mode="L")
+
+    # Crop blank margins (bbox of dark pixels), keeping a little padding
+    bbox = ImageOps.invert(binary).getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        binary = binary.crop((
+            max(0, left - _OCR_MARGIN), max(0, top - _OCR_MARGIN),
+            min(binary.width, right + _OCR_MARGIN), min(binary.height, bottom + _OCR_MARGIN),
+        ))
+    return binary
+
+
+def _split_ocr_tiles(binary, tile_pixels=_OCR_TILE_PIXELS):
+    """Cut a large binarized image into horizontal strips along blank rows."""
+    count = -(-binary.width * binary.height // tile_pixels)
+    if count <= 1:
+        return [binary]
+
+    # Mean brightness per row; cut at the whitest row near each nominal boundary
+    rows = list(binary.resize((1, binary.height), Image.BOX).getdata())
+    window = max(1, binary.height // (count * 4))
+    cuts = [0]
+    for k in range(1, count):
+        nominal = k * binary.height // count
+        low, high = max(cuts[-1] + 1, nominal - window), min(binary.height - 1, nominal + window)
+        if low >= high:
+            continue
+        cuts.append(max(range(low, high), key=lambda row: (rows[row], -abs(row - nominal))))
+    cuts.append(binary.height)
+    return [binary.crop((0, top, binary.width, bottom)) for top, bottom in zip(cuts, cuts[1:]) if bottom > top]
+
+
+def _init_ocr_worker():
+    """Process-pool initializer: one Tesseract thread per worker, so N workers use N cores."""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _ocr_pdf_page(source, index, dpi=300, timeout=30):
+    """Process-pool worker: rasterize one PDF page and OCR it. Returns None on failure."""
+    try:
+        if pdfium is not None:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                images = [pdf[index].render(scale=dpi / 72).to_pil()]
+            finally:
+                pdf.close()
+        else:
+            with _open_source(source) as file:
+                page = PyPDF2.PdfReader(file).pages[index]
+                images = [Image.open(io.BytesIO(image.data)) for image in page.images]
+
+        texts = []
+        for image in images:
+            with image:
+                texts.append(pytesseract.image_to_string(_prepare_for_ocr(image), timeout=timeout))
+        return "\n".join(texts)
+    except Exception:
+        return None
+
+
+# TXT files are decoded in slices of at most this many bytes, even without newlines
+_TXT_SLICE_BYTES = 256 * 1024
+
+# Encoding is decided from this much of the start of a text file
+_ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# Byte-order marks; UTF-32 LE must be checked before UTF-16 LE (same prefix)
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+_TEXT_BOMS = tuple(bom for bom, _ in _BOM_ENCODINGS)
+
+
+def _decode_fallback(error):
+    """Codec error handler: bytes that don't fit the detected encoding are read
+    as cp1252 (latin-1 for the few bytes cp1252 leaves undefined), like the
+    old per-line latin-1 retry but without decoding anything twice."""
+    raw = error.object[error.start:error.end]
+    try:
+        return raw.decode("cp1252"), error.end
+    except UnicodeDecodeError:
+        return raw.decode("latin-1"), error.end
+
+
+codecs.register_error("lecturebuddies-fallback", _decode_fallback)
+
+
+def _utf16_byte_order(sample):
+    """"utf-16-le"/"utf-16-be" if a BOM-less sample has the NUL pattern of UTF-16 text."""
+    if len(sample) < 4:
+        return None
+    even, odd = sample[0::2], sample[1::2]
+    even_nuls, odd_nuls = even.count(0), odd.count(0)
+    if odd_nuls > 0.3 * len(odd) and even_nuls < 0.05 * len(even):
+        return "utf-16-le"
+    if even_nuls > 0.3 * len(even) and odd_nuls < 0.05 * len(odd):
+        return "utf-16-be"
+    return None
+
+
+def detect_text_encoding(data, sample_size=_ENCODING_SAMPLE_BYTES):
+    """
+    Return (encoding, bom_length) for text bytes (bytes or mmap).
+
+    A byte-order mark wins. Otherwise a sample from the start decides: UTF-16
+    if it has the NUL pattern of UTF-16 text, UTF-8 if it decodes as UTF-8
+    (or has more valid multi-byte characters than invalid bytes), then cp1252
+    (Windows notes) and finally latin-1, which accepts anything.
+    """
+    head = bytes(data[:4])
+    for bom, encoding in _BOM_ENCODINGS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+
+    sample = bytes(data[:sample_size])
+    byte_order = _utf16_byte_order(sample)
+    if byte_order:
+        return byte_order, 0
+    try:
+        # Not final unless the sample is the whole file: it may end mid-character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=len(sample) == len(data))
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        pass
+    # Mostly UTF-8 with a few stray bytes (pasted from elsewhere): stay UTF-8,
+    # the stray bytes go through the cp1252 fallback
+    decoded = sample.decode("utf-8", errors="replace")
+    invalid = decoded.count("\ufffd")
+    if sum(1 for char in decoded if char > "\x7f") - invalid > invalid:
+        return "utf-8", 0
+    try:
+        sample.decode("cp1252")
+        return "cp1252", 0
+    except UnicodeDecodeError:
+        return "latin-1", 0
+
+
+class ExtractionBudget:
+    """
+    Limits for one extraction and the reason it stopped early, if it did.
+
+    A fresh budget is made per document, so one shared DocumentProcessor can
+    serve several uploads at once. None means unlimited.
+    """
+
+    def __init__(self, max_bytes=None, max_pages=None, max_ocr_seconds=None, max_output_chars=None):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.max_output_chars = max_output_chars
+        self.ocr_deadline = None if max_ocr_seconds is None else time.perf_counter() + max_ocr_seconds
+        self.truncated = None
+        # Time-based cuts depend on machine load, so those results are not cached
+        self.cacheable = True
+
+    def stop(self, reason, cacheable=True):
+        """Record why extraction stopped early (the first reason wins)."""
+        if self.truncated is None:
+            self.truncated = reason
+        self.cacheable = self.cacheable and cacheable
+
+    def skip_cache(self):
+        """Keep the result out of the cache without marking it truncated (e.g. a page failed OCR)."""
+        self.cacheable = False
+
+    def ocr_seconds_left(self):
+        if self.ocr_deadline is None:
+            return None
+        return max(0.0, self.ocr_deadline - time.perf_counter())
+
+    def ocr_timeout(self, default):
+        """Per-call Tesseract timeout that also respects the OCR deadline."""
+        left = self.ocr_seconds_left()
+        return default if left is None else min(default, left)
+
+    def finish(self, content):
+        """Append a truncation marker to real (non-status) output."""
+        if self.truncated and not is_status_marker(content):
+            return f"{content}\n\n[Truncated: {self.truncated}]"
+        return content
+
+
+# Per-process DocumentProcessor used by process_documents workers
+_worker_processor = None
+
+
+def _extract_in_worker(source, file_extension, options):
+    """Process-pool worker: extract one whole document (no nested page or OCR pool).
+    Returns (content, cacheable)."""
+    global _worker_processor
+    if _worker_processor is None:
+        # Scanned pages are OCR'd right here, so cap Tesseract like the OCR pool does
+        _init_ocr_worker()
+        _worker_processor = DocumentProcessor(pdf_workers=1, **options)
+    budget = _worker_processor._new_budget()
+    try:
+        return _worker_processor._extract(source, file_extension, budget), budget.cacheable
+    except Exception as e:
+        return StatusMarker(f"[File processing error: {str(e)}]"), False
+
+
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, cache=None, pdf_workers=None, parallel_min_pages=24,
+                 ocr_scanned_pages=False, ocr_workers=2, ocr_timeout=30,
+                 max_bytes=None, max_pages=None, max_ocr_seconds=None, max_output_chars=None,
+                 pdf_backend=None):
         self.supported_formats = {
-            ".txt", ".pdf", ".docx", ".doc", ".png", ".jpg", ".jpeg"
+            ".txt", ".pdf", ".docx", ".doc", ".png", ".jpg", ".jpeg", ".gif", ".bmp"
         }
+        # Optional ExtractionCache; repeat uploads skip PyPDF2/Tesseract entirely
+        self.cache = cache
+
+        # PDF text engines, preferred first (see pdf_backends.resolve_backends):
+        # "auto" picks the fastest installed one, the rest are per-page fallbacks
+        self.pdf_backends = resolve_backends(pdf_backend)
+
+        # Parallel PDF extraction: PDFs with at least parallel_min_pages pages are
+        # split into page ranges across a process pool (pdf_workers=1 disables it)
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        self.parallel_min_pages = parallel_min_pages
+
+        # OCR fallback for PDF pages without a text layer (scanned handouts);
+        # only those pages are rasterized, in a separate bounded pool
+        # (ocr_workers=0 OCRs them inline, e.g. inside process_documents workers)
+        self.ocr_scanned_pages = ocr_scanned_pages
+        self.ocr_workers = max(0, ocr_workers)
 
-    def process_document(self, filepath):
+        # Image OCR: per-call Tesseract timeout plus success/latency counters
+        self.ocr_timeout = ocr_timeout
+        self._ocr_stats = {"images": 0, "succeeded": 0, "failed": 0, "tiles": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        self._ocr_stats_lock = threading.Lock()
+
+        # Per-document budgets (None = unlimited). Larger input is cut short and
+        # the output ends with a "[Truncated: ...]" marker; PDFs, Word files and
+        # images over max_bytes are rejected since a partial file can't be parsed
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.max_ocr_seconds = max_ocr_seconds
+        self.max_output_chars = max_output_chars
+
+        self._pools = {}
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **options):
+        """
+        Processor with the app's per-upload budgets (LECTUREBUDDIES_MAX_UPLOAD_MB,
+        _MAX_PAGES, _MAX_OCR_SECONDS, _MAX_OUTPUT_CHARS). The budgets are part
+        of the cache key, so everything sharing the extraction cache (the app,
+        ingest.py) builds its processor here; options override the defaults.
+        """
+        settings = {
+            "ocr_scanned_pages": True,
+            "max_bytes": int(os.getenv("LECTUREBUDDIES_MAX_UPLOAD_MB", "200")) * 1024 * 1024,
+            "max_pages": int(os.getenv("LECTUREBUDDIES_MAX_PAGES", "1000")),
+            "max_ocr_seconds": float(os.getenv("LECTUREBUDDIES_MAX_OCR_SECONDS", "120")),
+            "max_output_chars": int(os.getenv("LECTUREBUDDIES_MAX_OUTPUT_CHARS", "5000000")),
+        }
+        settings.update(options)
+        return cls(**settings)
+
+    def close(self):
+        """Shut down the worker pools (they are recreated on demand)."""
+        with self._pool_lock:
+            for pool in self._pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._pools.clear()
+
+    def _get_pool(self, name="pdf"):
+        with self._pool_lock:
+            if name not in self._pools:
+                if name == "ocr":
+                    self._pools[name] = ProcessPoolExecutor(
+                        max_workers=self.ocr_workers, initializer=_init_ocr_worker
+                    )
+                else:
+                    self._pools[name] = ProcessPoolExecutor(max_workers=self.pdf_workers)
+            return self._pools[name]
+
+    def process_document(self, source, filename=None):
         """
         Detect file type and extract text safely.
+        source can be a file path, raw bytes or a file-like object (BytesIO,
+        Streamlit UploadedFile); in-memory input never touches the disk.
         Always returns a string (even if it's an error).
         """
         try:
-            file_extension = os.path.splitext(filepath)[1].lower()
-
-            if file_extension == ".txt":
-                return self._process_txt(filepath)
-            elif file_extension == ".pdf":
-                return self._process_pdf(filepath)
-            elif file_extension in [".docx", ".doc"]:
-                return self._process_word(filepath)
-            elif file_extension in [".png", ".jpg", ".jpeg"]:
-                return self._process_image(filepath)
-            else:
-                return f"[Unsupported file format: {file_extension}]"
+            source, file_extension = self._resolve_source(source, filename)
+            if file_extension not in self.supported_formats:
+                return StatusMarker(f"[Unsupported file format: {file_extension or 'unknown'}]")
+
+            key, cached = self._cache_lookup(source, file_extension)
+            if cached is not None:
+                return cached
+
+            budget = self._new_budget()
+            content = self._extract(source, file_extension, budget)
+            if budget.cacheable:
+                self._cache_store(key, content)
+            return content
 
         except Exception as e:
-            return f"[File processing error: {str(e)}]"
+            return StatusMarker(f"[File processing error: {str(e)}]")
+
+    def process_documents(self, sources, progress_callback=None):
+        """
+        Extract many documents concurrently (e.g. a whole course folder).
+
+        Cache hits are answered immediately; the rest run one file per worker
+        in the process pool (pdf_workers processes). A failing file only
+        affects its own result. progress_callback(done, total, result) is
+        called from the calling thread as each file finishes, so it may
+        update Streamlit widgets. Returns DocumentResults in input order.
+        """
+        sources = list(sources)
+        results = [None] * len(sources)
+        done = 0
+
+        def finish(index, content, started, size):
+            nonlocal done
+            result = DocumentResult(
+                sources[index], content, not is_status_marker(content), time.perf_counter() - started, size
+            )
+            results[index] = result
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done, len(sources), result)
+
+        options = {
+            "ocr_scanned_pages": self.ocr_scanned_pages, "ocr_workers": 0, "ocr_timeout": self.ocr_timeout,
+            "max_bytes": self.max_bytes, "max_pages": self.max_pages,
+            "max_ocr_seconds": self.max_ocr_seconds, "max_output_chars": self.max_output_chars,
+            "pdf_backend": self.pdf_backends[0],
+        }
+        futures = {}
+        for index, source in enumerate(sources):
+            started, size = time.perf_counter(), 0
+            try:
+                payload, file_extension = self._resolve_source(source)
+                size = os.path.getsize(payload) if isinstance(payload, str) else len(payload)
+                if file_extension not in self.supported_formats:
+                    finish(index, StatusMarker(f"[Unsupported file format: {file_extension or 'unknown'}]"), started, size)
+                    continue
+
+                key, cached = self._cache_lookup(payload, file_extension)
+                if cached is not None:
+                    finish(index, cached, started, size)
+                elif self.pdf_workers <= 1:
+                    budget = self._new_budget()
+                    content = self._extract(payload, file_extension, budget)
+                    if budget.cacheable:
+                        self._cache_store(key, content)
+                    finish(index, content, started, size)
+                else:
+                    future = self._get_pool().submit(_extract_in_worker, payload, file_extension, options)
+                    futures[future] = (index, key, started, size)
+            except Exception as e:
+                finish(index, StatusMarker(f"[File processing error: {str(e)}]"), started, size)
+
+        for future in as_completed(futures):
+            index, key, started, size = futures[future]
+            try:
+                content, cacheable = future.result()
+                if cacheable:
+                    self._cache_store(key, content)
+            except Exception as e:
+                content = StatusMarker(f"[File processing error: {str(e)}]")
+            finish(index, content, started, size)
+
+        return results
+
+    def cache_stats(self):
+        """Hit/miss counters of the extraction cache (empty dict when disabled)."""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _resolve_source(self, source, filename=None):
+        """Return (path or bytes, type key) for any accepted input."""
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            return path, os.path.splitext(path)[1].lower()
+
+        mime_type = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+        else:
+            # File-like: prefer getvalue() so the caller's read position is left alone
+            data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+            filename = filename or getattr(source, "name", None)
+            mime_type = getattr(source, "type", None)
+        return data, detect_file_type(data, filename, mime_type)
+
+    def _new_budget(self):
+        return ExtractionBudget(self.max_bytes, self.max_pages, self.max_ocr_seconds, self.max_output_chars)
+
+    def _check_size(self, source, file_extension, budget):
+        """Return an error message for input over max_bytes that can't be truncated."""
+        if budget.max_bytes is None:
+            return None
+        size = os.path.getsize(source) if isinstance(source, str) else len(source)
+        if size <= budget.max_bytes:
+            return None
+        if file_extension == ".txt":
+            budget.stop(f"read the first {budget.max_bytes:,} of {size:,} bytes")
+            return None
+        return StatusMarker(f"[File too large: {size / (1024 * 1024):.1f} MB exceeds the {budget.max_bytes / (1024 * 1024):.1f} MB limit]")
+
+    def _extract(self, source, file_extension, budget=None):
+        """Run the extractor matching file_extension within budget."""
+        budget = budget or self._new_budget()
+        error = self._check_size(source, file_extension, budget)
+        if error:
+            return error
+
+        if file_extension == ".txt":
+            content = self._process_txt(source, budget)
+        elif file_extension == ".pdf":
+            content = self._process_pdf(source, budget)
+        elif file_extension in [".docx", ".doc"]:
+            content = self._process_word(source, budget)
+        elif file_extension in [".png", ".jpg", ".jpeg", ".gif", ".bmp"]:
+            content = self._process_image(source, budget)
+        else:
+            return StatusMarker(f"[Unsupported file format: {file_extension}]")
+        return budget.finish(content)
+
+    # ------------------------
+    # Streaming API
+    # ------------------------
+
+    def iter_pages(self, source, filename=None):
+        """
+        Yield cleaned text one page at a time as TextChunk(text, page, start, end, kind).
+
+        start/end are offsets into the string process_document would return
+        (chunks joined by single spaces). PDFs yield real pages, TXT files are
+        split on form feeds, and formats without pages (DOCX) use page=None.
+        Unlike process_document, read errors are raised, not returned, and
+        budget truncation simply ends the iteration.
+        """
+        source, file_extension, budget = self._prepare_stream(source, filename)
+        yield from self._iter_cleaned(self._iter_page_units(source, file_extension, budget), budget)
+
+    def iter_chunks(self, source, filename=None):
+        """
+        Like iter_pages, but yields one TextChunk per paragraph (per table
+        cell in Word files). Word headings have kind "h1".."h9".
+        """
+        source, file_extension, budget = self._prepare_stream(source, filename)
+        yield from self._iter_cleaned(self._iter_units(source, file_extension, budget), budget)
+
+    def process_structured(self, source, filename=None):
+        """
+        Extract a StructuredDocument: the cleaned text (same as
+        process_document, minus any truncation marker) plus page, paragraph
+        and heading offsets. Headings come from Word styles, or for PDF/TXT
+        from short title-like paragraphs. Errors are raised, not returned,
+        and the result is not cached.
+        """
+        source, file_extension, budget = self._prepare_stream(source, filename)
+        chunks = self._iter_cleaned(self._iter_units(source, file_extension, budget), budget)
+        if file_extension not in (".docx", ".doc"):
+            chunks = (chunk._replace(kind=heading_kind(chunk.text)) for chunk in chunks)
+        document = StructuredDocument.from_chunks(chunks)
+        document.truncated = budget.truncated
+        return document
+
+    def _prepare_stream(self, source, filename):
+        """Resolve source for the raising APIs: (source, file_extension, budget)."""
+        source, file_extension = self._resolve_source(source, filename)
+        if file_extension not in self.supported_formats:
+            raise ValueError(f"Unsupported file format: {file_extension or 'unknown'}")
+        budget = self._new_budget()
+        error = self._check_size(source, file_extension, budget)
+        if error:
+            raise ValueError(error.strip("[]"))
+        return source, file_extension, budget
+
+    def _iter_cleaned(self, units, budget=None):
+        """Clean (page, raw_text[, kind]) units and attach offsets in the joined output.
+        Stops early (closing the unit source) when budget page/char limits are hit."""
+        max_pages = budget.max_pages if budget else None
+        max_chars = budget.max_output_chars if budget else None
+        offset = 0
+        try:
+            for unit in units:
+                page, raw_text = unit[0], unit[1]
+                kind = unit[2] if len(unit) > 2 else "text"
+                if max_pages is not None and page is not None and page > max_pages:
+                    budget.stop(f"stopped after {max_pages} pages")
+                    return
+                text = self._clean_text(raw_text)
+                if not text:
+                    continue
+                if offset:
+                    offset += 1  # the space joining this chunk to the previous one
+                if max_chars is not None and offset + len(text) > max_chars:
+                    # Keep whole words up to the limit
+                    text = text[:max(0, max_chars - offset)].rsplit(" ", 1)[0] if max_chars > offset else ""
+                    budget.stop(f"output limited to {max_chars:,} characters")
+                    if text:
+                        yield TextChunk(text, page, offset, offset + len(text), kind)
+                    return
+                yield TextChunk(text, page, offset, offset + len(text), kind)
+                offset += len(text)
+        finally:
+            # Stop upstream work (page pools, OCR futures) right away
+            if hasattr(units, "close"):
+                units.close()
+
+    def _join_cleaned(self, units, budget=None):
+        return " ".join(chunk.text for chunk in self._iter_cleaned(units, budget))
+
+    def _iter_units(self, source, file_extension, budget=None):
+        """Yield (page, raw_text[, kind]) paragraph-level units in document order."""
+        if file_extension == ".txt":
+            yield from self._iter_txt_units(source, budget)
+        elif file_extension == ".pdf":
+            for page, text in self._iter_pdf_pages(source, budget):
+                for paragraph in _pdf_paragraphs(text):
+                    yield page, paragraph
+        elif file_extension in [".docx", ".doc"]:
+            yield from self._iter_word_units(source)
+        elif file_extension in [".png", ".jpg", ".jpeg", ".gif", ".bmp"]:
+            yield 1, self._ocr_image(source, budget)
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+
+    def _iter_page_units(self, source, file_extension, budget=None):
+        """Yield (page, raw_text) per page, grouping paragraph units when needed."""
+        if file_extension == ".pdf":
+            yield from self._iter_pdf_pages(source, budget)
+            return
+
+        # Long page-less runs are flushed in pieces to keep memory bounded
+        buffer, size, current = [], 0, None
+        for unit in self._iter_units(source, file_extension, budget):
+            page, text = unit[0], unit[1]
+            if buffer and (page != current or size >= _MAX_UNIT_CHARS):
+                yield current, "\n".join(buffer)
+                buffer, size = [], 0
+            current = page
+            buffer.append(text)
+            size += len(text)
+        if buffer:
+            yield current, "\n".join(buffer)
 
     # ------------------------
     # File Type Processors
     # ------------------------
 
-    def _process_txt(self, filepath):
+    def _process_txt(self, source, budget=None):
         """Extract text from .txt files."""
         try:
-            with open(filepath, "r", encoding="utf-8") as file:
-                content = file.read()
-            return self._clean_text(content)
-        except UnicodeDecodeError:
-            try:
-                with open(filepath, "r", encoding="latin-1") as file:
-                    content = file.read()
-                return self._clean_text(content)
-            except Exception as e:
-                return f"[Error reading TXT file: {str(e)}]"
+            return self._join_cleaned(self._iter_txt_units(source, budget), budget)
+        except Exception as e:
+            return StatusMarker(f"[Error reading TXT file: {str(e)}]")
+
+    def _iter_txt_lines(self, data, start, limit, encoding, final=True):
+        """
+        Yield the lines of data[start:limit] decoded with one incremental
+        decoder, slice by slice, so characters may straddle slices. \r\n and
+        \r count as line ends. Lines longer than a slice come out in pieces.
+        With final=False (input cut at a byte budget) an incomplete last
+        character is dropped.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors="lecturebuddies-fallback")
+        pending = ""
+        for position in range(start, limit, _TXT_SLICE_BYTES):
+            stop = min(position + _TXT_SLICE_BYTES, limit)
+            text = pending + decoder.decode(data[position:stop], final=final and stop == limit)
+
+            # A trailing \r may be the first half of \r\n in the next slice
+            held = ""
+            if stop < limit and text.endswith("\r"):
+                text, held = text[:-1], "\r"
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+            lines = text.split("\n")
+            last = lines.pop()
+            for line in lines:
+                yield line + "\n"
+            if len(last) >= _TXT_SLICE_BYTES:
+                yield last
+                last = ""
+            pending = last + held
+        if pending:
+            yield pending
+
+    def _iter_txt_units(self, source, budget=None):
+        """
+        Yield (page, paragraph) from a text file.
+        The file is memory-mapped and read once: the encoding is detected
+        from a BOM or a sample (see detect_text_encoding), then the bytes are
+        decoded incrementally, stopping at the budget's max_bytes.
+        """
+        page, paragraph, size = 1, [], 0
+        flush_at = _MAX_UNIT_CHARS
+        file = data = None
+        try:
+            if isinstance(source, str):
+                file = open(source, "rb")
+                length = os.fstat(file.fileno()).st_size
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if length else b""
+            else:
+                data, length = source, len(source)
+
+            encoding, bom_length = detect_text_encoding(data)
+            limit, final = length, True
+            if budget is not None and budget.max_bytes is not None and length > budget.max_bytes:
+                limit, final = budget.max_bytes, False
+
+            for line in self._iter_txt_lines(data, bom_length, limit, encoding, final):
+                for i, piece in enumerate(line.split("\f")):
+                    if i:
+                        # Form feed: close the paragraph and start a new page
+                        if paragraph:
+                            yield page, "".join(paragraph)
+                            paragraph, size, flush_at = [], 0, _MAX_UNIT_CHARS
+                        page += 1
+                    if piece.strip():
+                        paragraph.append(piece)
+                        size += len(piece)
+                    elif paragraph:
+                        yield page, "".join(paragraph)
+                        paragraph, size, flush_at = [], 0, _MAX_UNIT_CHARS
 
-    def _process_pdf(self, filepath):
+                if size >= flush_at:
+                    # Flush at the last whitespace so a sliced line isn't split mid-word
+                    text = "".join(paragraph)
+                    cut = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"))
+                    if cut > 0:
+                        yield page, text[:cut]
+                        paragraph, size, flush_at = [text[cut:]], len(text) - cut, _MAX_UNIT_CHARS
+                    else:
+                        # One unbroken token: splitting it would make cleaning insert a
+                        # space, so keep it whole; check again once it has doubled
+                        paragraph, flush_at = [text], 2 * size
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            if file is not None:
+                file.close()
+        if paragraph:
+            yield page, "".join(paragraph)
+
+    def _process_pdf(self, source, budget=None):
         """Extract text from PDF files."""
         try:
-            with open(filepath, "rb") as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                content = ""
-                for page in pdf_reader.pages:
-                    extracted = page.extract_text()
-                    if extracted:
-                        content += extracted + "\n"
-            return self._clean_text(content) if content else "[No text extracted from PDF]"
+            content = self._join_cleaned(self._iter_pdf_pages(source, budget), budget)
+            return content if content else StatusMarker("[No text extracted from PDF]")
         except Exception as e:
-            return f"[Error reading PDF: {str(e)}]"
+            return StatusMarker(f"[Error reading PDF: {str(e)}]")
 
-    def _process_word(self, filepath):
-        """Extract text from Word documents (.docx and .doc)."""
+    def _iter_pdf_pages(self, source, budget=None):
+        """Yield (page_number, raw_text) for every PDF page, in order."""
+        pages = self._iter_pdf_text_layer(source, budget)
+        if not self.ocr_scanned_pages:
+            yield from pages
+            return
+
+        # Pages with a text layer pass straight through; empty ones are OCR'd
+        # in the background while later pages are still being extracted
+        pending = deque()
+        ocr_source, spill_path = source, None
+        try:
+            for number, text in pages:
+                if not text.strip():
+                    if spill_path is None and self.ocr_workers and not isinstance(source, str) and len(source) > _OCR_SPILL_BYTES:
+                        # Pool tasks are pickled: pass a path, not the whole PDF once per scanned page
+                        ocr_source = spill_path = _spill_to_temp_file(source, ".pdf")
+                    text = self._submit_page_ocr(ocr_source, number, budget)
+                pending.append((number, text))
+                # Release pages in order as soon as the head of the queue is ready
+                while pending:
+                    number, text = pending[0]
+                    if isinstance(text, Future):
+                        if not text.done():
+                            break
+                        text = self._ocr_text(text.result(), budget)
+                    pending.popleft()
+                    yield number, text
+
+            while pending:
+                number, text = pending.popleft()
+                yield number, self._page_ocr_result(text, budget)
+        finally:
+            for _, text in pending:
+                if isinstance(text, Future):
+                    text.cancel()
+            if spill_path is not None:
+                try:
+                    os.unlink(spill_path)
+                except OSError:
+                    pass
+
+    def _submit_page_ocr(self, source, number, budget):
+        """Queue OCR of a scanned page, or return "" once the OCR time budget is spent."""
+        timeout = budget.ocr_timeout(self.ocr_timeout) if budget else self.ocr_timeout
+        if timeout <= 0:
+            budget.stop("OCR time limit reached, remaining scanned pages skipped", cacheable=False)
+            return ""
+        if self.ocr_workers == 0:
+            # No nested pool inside pool workers: its processes would outlive the task
+            return self._ocr_text(_ocr_pdf_page(source, number - 1, timeout=timeout), budget)
+        return self._get_pool("ocr").submit(_ocr_pdf_page, source, number - 1, timeout=timeout)
+
+    def _page_ocr_result(self, text, budget):
+        if not isinstance(text, Future):
+            return text
         try:
-            doc = Document(filepath)
-            content = ""
+            return self._ocr_text(text.result(timeout=budget.ocr_seconds_left() if budget else None), budget)
+        except FutureTimeoutError:
+            text.cancel()
+            budget.stop("OCR time limit reached, remaining scanned pages skipped", cacheable=False)
+            return ""
+
+    def _ocr_text(self, text, budget):
+        """
+        Page text from _ocr_pdf_page. A failed page (Tesseract missing, timeout,
+        render error) reads as empty but keeps the result out of the cache, so
+        it is OCR'd again once the problem is fixed.
+        """
+        if text is None:
+            if budget is not None:
+                budget.skip_cache()
+            return ""
+        return text
+
+    def _iter_pdf_text_layer(self, source, budget=None):
+        """Yield (page_number, text_layer) for every PDF page (up to max_pages)."""
+        with PdfTextReader(source, self.pdf_backends) as reader:
+            page_count = reader.page_count
+            if budget is not None and budget.max_pages is not None and page_count > budget.max_pages:
+                budget.stop(f"stopped after {budget.max_pages} of {page_count} pages")
+                page_count = budget.max_pages
+            if self.pdf_workers <= 1 or page_count < self.parallel_min_pages:
+                yield from enumerate(reader.iter_pages(0, page_count), start=1)
+                return
 
-            # Extract paragraphs
-            for paragraph in doc.paragraphs:
-                content += paragraph.text + "\n"
+        # Large file: pages are parsed again inside the workers
+        yield from enumerate(self._iter_pdf_parallel(source, page_count), start=1)
 
-            # Extract tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        content += cell.text + " "
-                content += "\n"
+    def _iter_pdf_parallel(self, source, page_count):
+        """Spread page ranges over the process pool and yield page texts in order."""
+        # A few ranges per worker keeps the pool busy when some pages are slower;
+        # in-memory PDFs are pickled to every range, so use one range per worker
+        ranges_per_worker = 4 if isinstance(source, str) else 1
+        range_size = max(1, -(-page_count // (self.pdf_workers * ranges_per_worker)))
+        starts = range(0, page_count, range_size)
+        stops = [min(start + range_size, page_count) for start in starts]
+        pool = self._get_pool()
+        backends = [self.pdf_backends] * len(starts)
+        for chunk in pool.map(_extract_pdf_page_range, [source] * len(starts), starts, stops, backends):
+            yield from chunk
 
-            return self._clean_text(content) if content else "[No text extracted from Word file]"
+    def _process_word(self, source, budget=None):
+        """Extract text from Word documents (.docx and .doc)."""
+        try:
+            content = self._join_cleaned(self._iter_word_units(source), budget)
+            return content if content else StatusMarker("[No text extracted from Word file]")
         except Exception as e:
-            return f"[Error reading Word document: {str(e)}]"
+            return StatusMarker(f"[Error reading Word document: {str(e)}]")
 
-    def _process_image(self, filepath):
+    def _iter_word_units(self, source):
+        """
+        Yield (None, text) for each paragraph and table cell in document order
+        (see _iter_docx_xml). Files the streaming reader can't open fall back
+        to python-docx.
+        """
+        units = _iter_docx_xml(source)
+        try:
+            first = next(units, None)
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            yield from self._iter_word_units_python_docx(source)
+            return
+        if first is not None:
+            yield first
+            yield from units
+
+    def _iter_word_units_python_docx(self, source):
+        """Yield (None, text[, kind]) for each paragraph, then one unit per table (python-docx)."""
+        doc = Document(source if isinstance(source, str) else io.BytesIO(source))
+
+        # Extract paragraphs
+        for paragraph in doc.paragraphs:
+            kind = _heading_kind_for_style(paragraph.style.name if paragraph.style is not None else "")
+            yield (None, paragraph.text, kind) if kind != "text" else (None, paragraph.text)
+
+        # Extract tables
+        for table in doc.tables:
+            yield None, " ".join(cell.text for row in table.rows for cell in row.cells)
+
+    def _process_image(self, source, budget=None):
         """Extract text from image files using OCR (safe with timeout)."""
         try:
-            with Image.open(filepath) as img:
-                img = img.convert("RGB")  # ensure format is consistent
-                # Add timeout to prevent hanging on large images
-                content = pytesseract.image_to_string(img, timeout=30)
-                cleaned = self._clean_text(content)
-                return cleaned if cleaned else "[No text detected in image]"
+            cleaned = self._join_cleaned([(1, self._ocr_image(source, budget))], budget)
+            return cleaned if cleaned else StatusMarker("[No text detected in image]")
         except Exception as e:
             # Be explicit when Tesseract is missing to help users
             if "tesseract is not installed" in str(e).lower() or "not found" in str(e).lower():
-                return "[OCR unavailable: Tesseract not found. Install Tesseract or set TESSERACT_CMD]"
-            return f"[Error reading image: {str(e)}]"
+                return StatusMarker("[OCR unavailable: Tesseract not found. Install Tesseract or set TESSERACT_CMD]")
+            return StatusMarker(f"[Error reading image: {str(e)}]")
+
+    def _ocr_image(self, source, budget=None):
+        """
+        Preprocess an image, OCR it (in parallel tiles if large) and return the raw text.
+        If the OCR time budget runs out part way, the tiles read so far are kept.
+        """
+        started = time.perf_counter()
+        tiles = []
+        # Add timeout to prevent hanging on large images
+        timeout = budget.ocr_timeout(self.ocr_timeout) if budget else self.ocr_timeout
+        try:
+            with _open_source(source) as file, Image.open(file) as img:
+                tiles = _split_ocr_tiles(_prepare_for_ocr(img))
+
+            if len(tiles) == 1:
+                text = pytesseract.image_to_string(tiles[0], timeout=timeout)
+            else:
+                # Tesseract runs as a subprocess, so threads are enough to use several cores
+                pool = ThreadPoolExecutor(max_workers=min(len(tiles), max(1, self.ocr_workers)))
+                try:
+                    futures = [pool.submit(pytesseract.image_to_string, tile, timeout=timeout) for tile in tiles]
+                    texts = []
+                    for future in futures:
+                        try:
+                            texts.append(future.result())
+                        except RuntimeError as e:
+                            # pytesseract signals its timeout with RuntimeError
+                            if budget is None or not texts or "timeout" not in str(e).lower():
+                                raise
+                            budget.stop(f"OCR time limit reached after {len(texts)} of {len(tiles)} image tiles", cacheable=False)
+                            break
+                finally:
+                    pool.shutdown(wait=True, cancel_futures=True)
+                text = "\n".join(texts)
+        except Exception:
+            self._record_ocr(False, time.perf_counter() - started, len(tiles))
+            raise
+        self._record_ocr(True, time.perf_counter() - started, len(tiles))
+        return text
+
+    def _record_ocr(self, succeeded, seconds, tiles):
+        with self._ocr_stats_lock:
+            stats = self._ocr_stats
+            stats["images"] += 1
+            stats["succeeded" if succeeded else "failed"] += 1
+            stats["tiles"] += tiles
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def ocr_stats(self):
+        """Image OCR success rate and latency since this processor was created."""
+        with self._ocr_stats_lock:
+            stats = dict(self._ocr_stats)
+        stats["success_rate"] = stats["succeeded"] / stats["images"] if stats["images"] else 0.0
+        stats["avg_seconds"] = stats["total_seconds"] / stats["images"] if stats["images"] else 0.0
+        return stats
 
     # ------------------------
     # Helpers
     # ------------------------
 
-    def _clean_text(self, text):
-        """Clean and normalize extracted text."""
-        if not text:
-            return ""
-
-        # Remove extra whitespace
-        text = re.sub(r"\s+", " ", text)
+    def _cache_lookup(self, source, file_extension):
+        """Return (key, cached_text); both None when caching is disabled."""
+        if self.cache is None:
+            return None, None
+        key = self._cache_key(source, file_extension)
+        return key, self.cache.get(key)
 
-        # Remove unwanted characters but keep punctuation
-        text = re.sub(r"[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]", "", text)
+    def _cache_store(self, key, content):
+        if key is not None and not is_status_marker(content):
+            self.cache.put(key, content)
 
-        # Normalize spaces
-        text = re.sub(r"\s+", " ", text)
+    def _cache_key(self, source, file_extension):
+        """SHA-256 of the file bytes (path or in-memory), tagged with extractor version and type."""
+        digest = hashlib.sha256()
+        if isinstance(source, str):
+            with open(source, "rb") as file:
+                for block in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(block)
+        else:
+            digest.update(source)
+        version = EXTRACTOR_VERSION
+        if file_extension == ".pdf":
+            # Scanned-page OCR only changes PDF output
+            version += ("+ocr" if self.ocr_scanned_pages else "") + "+" + self.pdf_backends[0]
+        # Budgets change the output, so they are part of the key (OCR time cuts are never cached)
+        limits = (self.max_bytes, self.max_pages, self.max_output_chars)
+        if any(limit is not None for limit in limits):
+            version += "+limits:" + ":".join("" if limit is None else str(limit) for limit in limits)
+        return make_cache_key(digest.hexdigest(), file_extension, version)
 
-        return text.strip()
+    def _clean_text(self, text):
+        """Clean and normalize extracted text (see text_normalizer)."""
+        return normalize_text(text)
 
     def get_document_summary(self, content, max_length=500):
-        """Generate a brief summary of the document content."""
+        """Extractive summary of the document (see summarizer.summarize)."""
         if not content:
-            return "[No content available to summarize]"
+            return StatusMarker("[No content available to summarize]")
 
-        if len(content) <= max_length:
+        if is_status_marker(content):
             return content
 
-        # Take first few sentences
-        sentences = content.split(".")
-        summary = ""
-        for sentence in sentences:
-            if len(summary + sentence) < max_length:
-                summary += sentence.strip() + ". "
-            else:
-                break
-
-        return summary.strip()
+        return summarize(content, max_length=max_length)
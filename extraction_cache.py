@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+# Default on-disk location; override with LECTUREBUDDIES_CACHE_DIR
+_DEFAULT_CACHE_DIR = os.path.join(".cache", "extraction")
+
+
+class ExtractionCache:
+    """
+    Two-tier cache for extracted document text.
+
+    Keys are content hashes built by DocumentProcessor (SHA-256 of the file
+    bytes plus the extractor version), so the same lecture PDF uploaded by
+    different students maps to the same entry.
+
+    - Memory tier: small LRU of recently used results, bounded by both
+      max_memory_items and max_memory_chars (one 5M-character document
+      must not pin hundreds of MB per process); larger texts go to disk only.
+    - Disk tier: SQLite table of zlib-compressed blobs, evicted
+      least-recently-used first once max_disk_bytes is exceeded.
+    """
+
+    def __init__(self, cache_dir=None, max_memory_items=128, max_memory_chars=16 * 1024 * 1024,
+                 max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.getenv("LECTUREBUDDIES_CACHE_DIR", _DEFAULT_CACHE_DIR)
+        self.max_memory_items = max_memory_items
+        self.max_memory_chars = max_memory_chars
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._memory_chars = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._db = None
+        if max_disk_bytes:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._db = sqlite3.connect(
+                    os.path.join(self.cache_dir, "extraction.sqlite3"),
+                    check_same_thread=False,
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " key TEXT PRIMARY KEY,"
+                    " data BLOB NOT NULL,"
+                    " size INTEGER NOT NULL,"
+                    " last_access REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+                self._db.commit()
+            except sqlite3.Error:
+                # Read-only or broken cache dir: keep working with memory tier only
+                self._db = None
+
+    # ------------------------
+    # Public API
+    # ------------------------
+
+    def get(self, key):
+        """Return cached text for key, or None on a miss."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+
+            text = self._disk_get(key)
+            if text is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, text)
+            return text
+
+    def put(self, key, text):
+        """Store text under key in both tiers."""
+        with self._lock:
+            self._memory_put(key, text)
+            self._disk_put(key, text)
+            self._stats["writes"] += 1
+
+    def stats(self):
+        """Hit/miss counters plus current tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["memory_items"] = len(self._memory)
+            stats["memory_chars"] = self._memory_chars
+            stats["disk_bytes"] = self._disk_size()
+            return stats
+
+    def clear(self):
+        """Drop every cached entry (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_chars = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM entries")
+                    self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+    # ------------------------
+    # Tiers
+    # ------------------------
+
+    def _memory_put(self, key, text):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_chars -= len(previous)
+        if len(text) > self.max_memory_chars:
+            return  # served from the disk tier instead
+        self._memory[key] = text
+        self._memory_chars += len(text)
+        while len(self._memory) > self.max_memory_items or self._memory_chars > self.max_memory_chars:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_chars -= len(evicted)
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return zlib.decompress(row[0]).decode("utf-8")
+        except (sqlite3.Error, zlib.error, UnicodeDecodeError):
+            return None
+
+    def _disk_put(self, key, text):
+        if self._db is None:
+            return
+        blob = zlib.compress(text.encode("utf-8"), 6)
+        if len(blob) > self.max_disk_bytes:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self._evict()
+            self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def _disk_size(self):
+        if self._db is None:
+            return 0
+        try:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def _evict(self):
+        """Delete least-recently-used rows until the disk tier fits its budget."""
+        total = self._disk_size()
+        if total <= self.max_disk_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM entries ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
@@ -0,0 +1,394 @@
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_cache import LLMCache, request_key
+
+
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+# Connections kept open to api.groq.com; Streamlit serves each session on its
+# own thread, so this bounds concurrent requests without queueing small loads
+_DEFAULT_POOL_SIZE = int(os.getenv("GROQ_POOL_SIZE", "16"))
+
+# (connect, read) seconds
+_DEFAULT_TIMEOUT = (5, 30)
+
+# Groq quota for the whole process; 0 turns a limit off
+_DEFAULT_RPM = int(os.getenv("GROQ_RPM", "30"))
+_DEFAULT_TPM = int(os.getenv("GROQ_TPM", "0"))
+# Longest a request may queue for quota before failing fast
+_DEFAULT_MAX_QUEUE_SECONDS = float(os.getenv("GROQ_MAX_QUEUE_SECONDS", "30"))
+_DEFAULT_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+
+# Answers that mean "not processed, try again later": safe to resend a POST
+_RETRY_STATUS = (429, 503)
+_BACKOFF_BASE = 0.5    # seconds; attempt n sleeps uniform(0, base * 2**n)
+_BACKOFF_CAP = 8.0
+_MAX_RETRY_DELAY = 20.0  # give up instead of sleeping longer than this
+
+
+class GroqError(Exception):
+    """
+    A failed Groq call. str(error) is a user-facing message; kind is one of
+    "config", "auth", "rate_limit", "timeout", "network" or "api".
+    """
+
+    def __init__(self, message, kind="api", status_code=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status_code = status_code
+
+
+def _parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class TokenBucket:
+    """Capacity per minute, refilled continuously. level may go negative while callers queue."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount):
+        """Seconds until amount is available (after everyone already queued)."""
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+class RateLimiter:
+    """
+    Process-wide token buckets for requests/minute and tokens/minute.
+
+    acquire() reserves capacity immediately and then sleeps until the
+    reservation is covered, so a class-wide burst is sent in arrival order
+    spread over the next seconds instead of hitting the API all at once and
+    getting 429s. A Retry-After from the API pauses every caller.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_wait=_DEFAULT_MAX_QUEUE_SECONDS):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_wait = max_wait
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "rejected": 0, "queue_depth": 0, "queue_max": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+    def acquire(self, tokens=0):
+        """Block until one request of about `tokens` tokens may be sent; returns seconds waited. Raises GroqError."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._not_before - now)
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_for(amount))
+            if wait > self.max_wait:
+                self._stats["rejected"] += 1
+                raise GroqError("The assistant is busy right now. Please retry in a few seconds.", "rate_limit")
+
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.level -= min(amount, bucket.capacity)
+            stats = self._stats
+            stats["acquired"] += 1
+            if wait > 0:
+                stats["waited"] += 1
+                stats["wait_total"] += wait
+                stats["wait_max"] = max(stats["wait_max"], wait)
+                stats["queue_depth"] += 1
+                stats["queue_max"] = max(stats["queue_max"], stats["queue_depth"])
+
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._stats["queue_depth"] -= 1
+        return wait
+
+    def settle(self, reserved, used):
+        """Return unused reserved tokens once the real usage is known."""
+        if self.tokens is not None and used is not None and reserved > used:
+            with self._lock:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + (reserved - used))
+
+    def pause(self, seconds):
+        """Hold every new request for `seconds` (server asked us to back off)."""
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_avg"] = stats["wait_total"] / stats["waited"] if stats["waited"] else 0.0
+        return stats
+
+
+class GroqClient:
+    """
+    Process-wide client for the Groq chat completions API.
+
+    One requests.Session with a sized connection pool is shared by every
+    caller, so after the first request TCP and TLS setup to api.groq.com are
+    reused (keep-alive) instead of paid on every message.
+
+    With a cache (LLMCache), repeated requests are answered locally; the
+    cache argument of chat()/stream_chat() overrides its temperature policy.
+
+    Every request first takes quota from the limiter (RateLimiter). 429 and
+    503 answers are retried with jittered exponential backoff, or after the
+    server's Retry-After when it sends one.
+    """
+
+    def __init__(
+        self, api_key=None, url=GROQ_CHAT_URL, pool_size=_DEFAULT_POOL_SIZE, timeout=_DEFAULT_TIMEOUT, cache=None,
+        limiter=None, max_retries=_DEFAULT_MAX_RETRIES,
+    ):
+        self.api_key = api_key if api_key is not None else os.getenv("GROQ_API_KEY")
+        self.url = url
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = limiter if limiter is not None else RateLimiter(_DEFAULT_RPM, _DEFAULT_TPM)
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        # No transport retries: a POST that reached the server must not be sent twice
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        # Streaming latency: time to first token (TTFT) and to the last one
+        self._stats = {
+            "streams": 0, "completed": 0, "first_tokens": 0, "ttft_total": 0.0, "ttft_max": 0.0, "ttft_last": None,
+            "stream_seconds": 0.0, "throttled": 0, "retries": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def chat(self, messages, model=DEFAULT_MODEL, temperature=0.7, max_tokens=1000, timeout=None, cache=None):
+        """
+        Send a chat completion request and return the reply text ("" if
+        empty). Raises GroqError. cache: None = cache policy, True/False =
+        always/never use the response cache.
+        """
+        key = self._cache_key(messages, model, temperature, max_tokens, cache)
+        if key is not None:
+            reply = self.cache.get(key)
+            if reply is not None:
+                return reply
+
+        started = time.perf_counter()
+        payload = {"model": model, "messages": messages, "temperature": float(temperature), "max_tokens": max_tokens}
+        response = self._post(payload, timeout)
+        try:
+            data = response.json()
+            reply = data["choices"][0]["message"].get("content") or ""
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            raise GroqError("Unexpected response from the Groq API.")
+        usage = data.get("usage") or {}
+        self.limiter.settle(self._estimate_tokens(payload), usage.get("total_tokens"))
+        if key is not None:
+            self.cache.put(key, reply, time.perf_counter() - started)
+        return reply
+
+    def stream_chat(self, messages, model=DEFAULT_MODEL, temperature=0.7, max_tokens=1000, timeout=None, cache=None):
+        """
+        Yield the reply text piece by piece as the server generates it
+        (stream: true, server-sent events). Raises GroqError.
+
+        Closing the generator early (consumer stopped, Streamlit rerun)
+        closes the HTTP response right away, which drops the connection so
+        the server stops generating. A cached reply is yielded in one piece;
+        only completed streams are cached.
+        """
+        key = self._cache_key(messages, model, temperature, max_tokens, cache)
+        if key is not None:
+            reply = self.cache.get(key)
+            if reply is not None:
+                yield reply
+                return
+
+        payload = {
+            "model": model, "messages": messages, "temperature": float(temperature),
+            "max_tokens": max_tokens, "stream": True,
+        }
+        started = time.perf_counter()
+        response = self._post(payload, timeout, stream=True)
+        first_token = None
+        completed = False
+        pieces = []
+        streamed_chars, usage = 0, None
+        try:
+            for line in response.iter_lines(chunk_size=256):
+                # SSE: "data: {json}" events separated by blank lines, ending with "data: [DONE]"
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    completed = True
+                    break
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    raise GroqError("Unexpected response from the Groq API.")
+                if event.get("error"):
+                    raise GroqError(f"API Error: {event['error'].get('message', event['error'])}")
+                # Groq reports usage in the last chunk (x_groq.usage)
+                usage = (event.get("x_groq") or {}).get("usage") or event.get("usage") or usage
+
+                choices = event.get("choices") or [{}]
+                piece = (choices[0].get("delta") or {}).get("content")
+                if piece:
+                    streamed_chars += len(piece)
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    if key is not None:
+                        pieces.append(piece)
+                    yield piece
+        except requests.exceptions.RequestException as e:
+            raise GroqError(f"Network error: stream interrupted ({e})", "network")
+        finally:
+            response.close()
+            self._record_stream(first_token, time.perf_counter() - started, completed)
+            # Give back the unused part of the reservation (reported usage, else an estimate)
+            reserved = self._estimate_tokens(payload)
+            used = (usage or {}).get("total_tokens")
+            if used is None:
+                used = reserved - (payload.get("max_tokens") or 0) + streamed_chars // 4
+            self.limiter.settle(reserved, used)
+        if completed and key is not None:
+            self.cache.put(key, "".join(pieces), time.perf_counter() - started)
+
+    def _cache_key(self, messages, model, temperature, max_tokens, cache):
+        """Cache key for this request, or None when the cache is off or bypassed."""
+        if self.cache is None:
+            return None
+        if not self.cache.should_cache(temperature, cache):
+            self.cache.bypass()
+            return None
+        return request_key(model, messages, temperature, max_tokens)
+
+    def _record_stream(self, first_token, seconds, completed):
+        with self._stats_lock:
+            stats = self._stats
+            stats["streams"] += 1
+            stats["completed"] += completed
+            stats["stream_seconds"] += seconds
+            if first_token is not None:
+                stats["first_tokens"] += 1
+                stats["ttft_total"] += first_token
+                stats["ttft_max"] = max(stats["ttft_max"], first_token)
+                stats["ttft_last"] = first_token
+
+    def stats(self):
+        """Streaming and retry counters, average time to first token, and the limiter's queue metrics."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["ttft_avg"] = stats["ttft_total"] / stats["first_tokens"] if stats["first_tokens"] else None
+        stats["limiter"] = self.limiter.stats()
+        return stats
+
+    @staticmethod
+    def _estimate_tokens(payload):
+        """Tokens to reserve: ~4 characters per prompt token plus the reply limit."""
+        prompt_chars = sum(len(message.get("content") or "") for message in payload["messages"])
+        return prompt_chars // 4 + (payload.get("max_tokens") or 0)
+
+    def _retry_delay(self, response, attempt):
+        """Seconds to wait before retry `attempt` (0-based), or None to give up."""
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is None:
+            # Full jitter: spreads a burst of failed requests over the whole interval
+            delay = random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+        else:
+            delay = retry_after + random.uniform(0, _BACKOFF_BASE)
+        return delay if delay <= _MAX_RETRY_DELAY else None
+
+    def _post(self, payload, timeout=None, stream=False):
+        """POST payload and return the successful response; map every failure to GroqError."""
+        if not self.api_key or not self.api_key.strip():
+            raise GroqError("Missing API key. Please set GROQ_API_KEY in your .env file.", "config")
+
+        reserved = self._estimate_tokens(payload)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(reserved)
+            try:
+                response = self.session.post(
+                    self.url,
+                    json=payload,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    timeout=timeout or self.timeout,
+                    stream=stream,
+                )
+            except requests.exceptions.Timeout:
+                raise GroqError("Request timed out. Please retry.", "timeout")
+            except requests.exceptions.RequestException as e:
+                raise GroqError(f"Network error: {e}", "network")
+
+            if response.status_code == 200:
+                return response
+
+            # Error bodies are small; read them so the connection goes back to the pool
+            body = response.text
+            response.close()
+            if response.status_code == 429:
+                with self._stats_lock:
+                    self._stats["throttled"] += 1
+            if response.status_code not in _RETRY_STATUS or attempt == self.max_retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            if delay is None:
+                break
+            if response.status_code == 429 and response.headers.get("Retry-After"):
+                # The quota is shared: hold everyone, not only this caller
+                self.limiter.pause(delay)
+            with self._stats_lock:
+                self._stats["retries"] += 1
+            time.sleep(delay)
+
+        if response.status_code == 401:
+            raise GroqError("Invalid API key. Please check GROQ_API_KEY in your .env file.", "auth", 401)
+        if response.status_code == 429:
+            raise GroqError("Too many requests. Please slow down and retry shortly.", "rate_limit", 429)
+        raise GroqError(f"API Error {response.status_code}: {body[:500]}", "api", response.status_code)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_groq_client():
+    """The shared GroqClient for this process (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GroqClient(cache=LLMCache())
+    return _client
@@ -0,0 +1,95 @@
+"""
+Headless bulk ingestion: preload a course folder into the extraction cache.
+
+    python ingest.py path/to/course [--workers 8] [--cache-dir .cache/extraction] [--no-ocr] [--vectors]
+
+Every supported file under the folder (PDF, DOCX, TXT, images) is extracted
+concurrently and stored in the same on-disk cache the Streamlit app uses, so
+students' later uploads of those files are cache hits. With --vectors the
+text is also embedded into the app's semantic index.
+"""
+import argparse
+import os
+import sys
+import time
+
+from document_processor import DocumentProcessor
+from extraction_cache import ExtractionCache
+from vector_index import VectorIndex, content_key
+
+
+def find_documents(root, extensions):
+    """All files under root with a supported extension, in a stable order."""
+    paths = []
+    for folder, _, filenames in os.walk(root):
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() in extensions:
+                paths.append(os.path.join(folder, filename))
+    return sorted(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preload course material into the LectureBuddies extraction cache.")
+    parser.add_argument("folder", help="directory to ingest (searched recursively)")
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=None, help="cache directory (default: $LECTUREBUDDIES_CACHE_DIR or .cache/extraction)")
+    parser.add_argument("--no-ocr", action="store_true", help="skip OCR of scanned PDF pages")
+    parser.add_argument("--pdf-backend", default=None, help="auto, pypdf2, pypdfium2 or pdfminer (default: $LECTUREBUDDIES_PDF_BACKEND or auto)")
+    parser.add_argument("--vectors", action="store_true", help="also add the extracted text to the semantic vector index")
+    parser.add_argument("--vector-dir", default=None, help="vector index directory (default: $LECTUREBUDDIES_VECTOR_DIR or .cache/vectors)")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    cache = ExtractionCache(cache_dir=args.cache_dir)
+    # Same budgets as the app, so preloaded entries are stored under the keys it looks up;
+    # no OCR deadline offline (it is not part of the key, and cut-short scans are not cached)
+    processor = DocumentProcessor.from_env(
+        cache=cache, pdf_workers=args.workers, ocr_scanned_pages=not args.no_ocr,
+        pdf_backend=args.pdf_backend, max_ocr_seconds=None,
+    )
+    paths = find_documents(args.folder, processor.supported_formats)
+    if not paths:
+        print(f"No supported documents found in {args.folder}")
+        return 1
+
+    def report(done, total, result):
+        if not args.quiet:
+            status = "ok  " if result.ok else "FAIL"
+            detail = f"{len(result.content):>9,} chars" if result.ok else result.content[:80]
+            print(f"[{done:>{len(str(total))}}/{total}] {status} {result.seconds:6.2f}s  {result.source}  {detail}")
+
+    started = time.perf_counter()
+    try:
+        results = processor.process_documents(paths, progress_callback=report)
+    finally:
+        processor.close()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    failed = [result for result in results if not result.ok]
+    total_mb = sum(result.size for result in results) / (1024 * 1024)
+    stats = cache.stats()
+    print(
+        f"\nIngested {len(results) - len(failed)}/{len(results)} files ({total_mb:.1f} MB) in {elapsed:.1f}s: "
+        f"{len(results) / elapsed:.2f} files/sec, {total_mb / elapsed:.2f} MB/sec"
+    )
+    print(f"Cache: {stats['hits']} already cached, {stats['writes']} written, {stats['disk_bytes'] / (1024 * 1024):.1f} MB on disk")
+    for result in failed:
+        print(f"  failed: {result.source}: {result.content}")
+
+    if args.vectors:
+        started = time.perf_counter()
+        index = VectorIndex(index_dir=args.vector_dir)
+        try:
+            chunks = sum(index.add_document(content_key(result.content), result.content) for result in results if result.ok)
+            index_stats = index.stats()
+        finally:
+            index.close()
+        print(
+            f"Vectors: {chunks:,} chunks added in {time.perf_counter() - started:.1f}s, "
+            f"{index_stats['documents']} documents / {index_stats['chunks']:,} chunks indexed"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
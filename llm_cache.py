@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+# Default on-disk location; override with LECTUREBUDDIES_LLM_CACHE_DIR
+_DEFAULT_CACHE_DIR = os.path.join(".cache", "llm")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize_content(content):
+    """Collapse whitespace so prompts differing only in spacing share an entry."""
+    return _WHITESPACE.sub(" ", content).strip() if isinstance(content, str) else content
+
+
+def request_key(model, messages, temperature, max_tokens):
+    """
+    SHA-256 of the normalized request. Temperature is part of the key, so a
+    temperature-0 answer is only ever served for another temperature-0
+    request of the same prompt.
+    """
+    normalized = {
+        "model": (model or "").strip().lower(),
+        "messages": [
+            {"role": (message.get("role") or "").strip().lower(), "content": _normalize_content(message.get("content"))}
+            for message in messages
+        ],
+        "temperature": round(float(temperature), 3),
+        "max_tokens": int(max_tokens) if max_tokens is not None else None,
+    }
+    data = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent cache of chat completion replies.
+
+    - Keys: request_key() of (model, messages, temperature, max_tokens).
+    - Storage: one SQLite table; entries expire after ttl seconds and the
+      least recently used ones are evicted beyond max_entries.
+    - Policy: requests up to max_temperature are cached by default. Above
+      it replies are meant to vary, so the cache is bypassed unless the
+      caller opts in (cache=True). Temperature 0 is deterministic, so those
+      hits are exactly what the API would return again.
+
+    Each entry keeps the latency of the original call, which is what a hit
+    saves; stats() reports the hit rate and the total saved.
+    """
+
+    def __init__(self, cache_dir=None, ttl=7 * 24 * 3600, max_entries=5000, max_temperature=0.3):
+        self.cache_dir = cache_dir or os.getenv("LECTUREBUDDIES_LLM_CACHE_DIR", _DEFAULT_CACHE_DIR)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "writes": 0, "evictions": 0, "saved_seconds": 0.0}
+
+        self._db = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.cache_dir, "responses.sqlite3"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " reply TEXT NOT NULL,"
+                " latency REAL NOT NULL,"
+                " expires REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            self._db.commit()
+        except sqlite3.Error:
+            # Read-only or broken cache dir: every request goes to the API
+            self._db = None
+
+    # ------------------------
+    # Public API
+    # ------------------------
+
+    def should_cache(self, temperature, cache=None):
+        """cache=True/False forces the decision; None applies the temperature policy."""
+        if self._db is None or cache is False:
+            return False
+        return cache is True or float(temperature) <= self.max_temperature
+
+    def bypass(self):
+        """Count a request that skipped the cache."""
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def get(self, key):
+        """Cached reply for key, or None on a miss (expired entries are misses)."""
+        if self._db is None:
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            row = None
+            try:
+                now = time.time()
+                row = self._db.execute("SELECT reply, latency, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[2] < now:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                elif row is not None:
+                    self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            except sqlite3.Error:
+                row = None
+
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["saved_seconds"] += max(0.0, row[1] - (time.perf_counter() - started))
+            return row[0]
+
+    def put(self, key, reply, latency):
+        """Store a reply with the latency (seconds) it took to produce."""
+        if not reply or self._db is None:
+            return
+        with self._lock:
+            now = time.time()
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, reply, latency, expires, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, reply, float(latency), now + self.ttl, now),
+                )
+                self._evict(now)
+                self._db.commit()
+                self._stats["writes"] += 1
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Hit/miss/bypass counters, hit rate, saved seconds and stored entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            try:
+                stats["entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._db else 0
+            except sqlite3.Error:
+                stats["entries"] = 0
+            return stats
+
+    def clear(self):
+        """Drop every cached reply (counters are kept)."""
+        with self._lock:
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ------------------------
+    # Eviction
+    # ------------------------
+
+    def _evict(self, now):
+        """Drop expired rows, then least-recently-used rows beyond max_entries."""
+        deleted = self._db.execute("DELETE FROM responses WHERE expires < ?", (now,)).rowcount
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            deleted += self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        self._stats["evictions"] += max(0, deleted)
@@ -0,0 +1,95 @@
+"""
+Concurrent Groq completions for features that need several independent
+calls (per-chunk quizzes, translation segments, flash card batches).
+
+    replies = run_parallel([{"messages": [...]}, {"messages": [...]}], concurrency=8, timeout=60)
+
+Each call still goes through the shared GroqClient, so connection reuse,
+the rate limiter and the response cache apply to every one of them; asyncio
+only overlaps the waiting. N calls take about as long as the slowest one
+(or the limiter's spacing), not the sum.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from groq_client import GroqError, get_groq_client
+
+
+# Calls in flight per fan-out; bounded again by the HTTP pool and the limiter
+_DEFAULT_CONCURRENCY = int(os.getenv("GROQ_FANOUT_CONCURRENCY", "8"))
+_DEFAULT_TIMEOUT = 60.0
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _call_executor():
+    """
+    Threads that run the blocking client calls. asyncio's default executor
+    is sized from the CPU count (5 threads on a 1-CPU server), which would
+    cap concurrency for I/O-bound calls, so the pool matches the HTTP pool.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("GROQ_POOL_SIZE", "16"))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="groq-fanout")
+    return _executor
+
+
+async def _run_one(client, semaphore, request, timeout):
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        # The HTTP read timeout matches, so the worker thread also gives up
+        call = dict(request, timeout=request.get("timeout") or (5, timeout))
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(_call_executor(), lambda: client.chat(**call)), timeout)
+        except asyncio.TimeoutError:
+            return GroqError("Request timed out. Please retry.", "timeout")
+        except GroqError as e:
+            return e
+        except Exception as e:
+            return GroqError(f"Unexpected error: {e}")
+
+
+async def gather_chat(requests, concurrency=_DEFAULT_CONCURRENCY, timeout=_DEFAULT_TIMEOUT, client=None, on_result=None):
+    """
+    Run client.chat(**request) for every request with at most `concurrency`
+    in flight and `timeout` seconds each. Returns results in request order:
+    the reply text, or the GroqError for calls that failed.
+
+    on_result(index, result) is called as each call finishes (on the
+    event loop's thread, i.e. the caller's thread under run_parallel).
+    """
+    client = client or get_groq_client()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index, request):
+        result = await _run_one(client, semaphore, request, timeout)
+        if on_result is not None:
+            on_result(index, result)
+        return result
+
+    return await asyncio.gather(*(run(index, request) for index, request in enumerate(requests)))
+
+
+def run_parallel(requests, concurrency=_DEFAULT_CONCURRENCY, timeout=_DEFAULT_TIMEOUT, client=None, on_result=None):
+    """
+    Blocking bridge to gather_chat for Streamlit scripts and callbacks.
+    With no event loop running in this thread (the normal Streamlit case)
+    the loop runs right here, so on_result may update st elements.
+    """
+    requests = list(requests)
+    if not requests:
+        return []
+    coroutine = gather_chat(requests, concurrency, timeout, client, on_result)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Already inside an event loop: run ours on a helper thread instead
+    with ThreadPoolExecutor(max_workers=1) as helper:
+        return helper.submit(asyncio.run, coroutine).result()
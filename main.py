@@ -1,13 +1,18 @@
 import streamlit as st
 import requests
-import PyPDF2
-from docx import Document
-import io
 import os
 import json
 import time
+from contextlib import closing
 from dotenv import load_dotenv
-from document_processor import DocumentProcessor
+from document_processor import DocumentProcessor, StatusMarker, is_status_marker
+from extraction_cache import ExtractionCache
+from groq_client import GroqError, get_groq_client
+from retrieval import CHARS_PER_TOKEN, BM25Index, format_passages, split_text
+from vector_index import VectorIndex, content_key
+from conversation import ConversationBuilder
+from llm_fanout import run_parallel
+from quiz_builder import SINGLE_CALL_CHARS as QUIZ_SINGLE_CALL_CHARS, generate_quiz
 import numpy as np
 import tempfile
 from faster_whisper import WhisperModel
@@ -71,6 +76,32 @@ init_session_state()
 load_dotenv()
 api_key = os.getenv("GROQ_API_KEY")
 
+# ==========================
+# SHARED DOCUMENT PROCESSOR
+# ==========================
+@st.cache_resource
+def get_extraction_cache():
+    """One extraction cache per server process, shared by every session."""
+    return ExtractionCache()
+
+@st.cache_resource
+def get_document_processor():
+    """
+    One DocumentProcessor per server process, used by every feature
+    (chatbot, quiz, flash cards, translation). Created once, so its cache
+    and worker pools survive Streamlit reruns.
+    Per-upload budgets keep one huge file from stalling the shared server.
+    """
+    return DocumentProcessor.from_env(cache=get_extraction_cache())
+
+@st.cache_resource
+def get_vector_index():
+    """
+    One offline semantic index per server process. Uploads are keyed by
+    their text, so a handout every student uploads is embedded only once.
+    """
+    return VectorIndex()
+
 # ==========================
 # GLOBAL STYLING - LECTUREBUDDIES THEME
 # ==========================
@@ -1009,260 +1040,23 @@ def show_welcome_screen():
 # CHATBOT AND SUMMARIZATION SECTION
 # ==========================
 def show_chatbot_feature():
-    import streamlit as st
-    import requests
-    import PyPDF2
-    from docx import Document
-    import io
-    import os
-    from dotenv import load_dotenv
-    import os
-    import re
-    import PyPDF2
-    from docx import Document
-    from PIL import Image
-    import pytesseract
-    
-    
-    import os
-    import re
-    import PyPDF2
-    from docx import Document
-    from PIL import Image
-    import pytesseract
-    
-    
-    # ✅ Configurable Tesseract OCR path with fallbacks
-    # Priority: ENV var TESSERACT_CMD -> Windows default path -> system PATH
-    _tesseract_env = os.getenv("TESSERACT_CMD")
-    _windows_default = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
-    try:
-        if _tesseract_env and os.path.exists(_tesseract_env):
-            pytesseract.pytesseract.tesseract_cmd = _tesseract_env
-        elif os.name == "nt" and os.path.exists(_windows_default):
-            pytesseract.pytesseract.tesseract_cmd = _windows_default
-        # else: rely on PATH; if not present, OCR calls will raise which we handle
-    except Exception:
-        # If configuration fails, we let _process_image handle exceptions gracefully
-        pass
-    
-    
-    class DocumentProcessor:
-        def __init__(self):
-            self.supported_formats = {
-                ".txt", ".pdf", ".docx", ".doc", ".png", ".jpg", ".jpeg"
-            }
-    
-        def process_document(self, filepath):
-            """
-            Detect file type and extract text safely.
-            Always returns a string (even if it's an error).
-            """
-            try:
-                file_extension = os.path.splitext(filepath)[1].lower()
-    
-                if file_extension == ".txt":
-                    return self._process_txt(filepath)
-                elif file_extension == ".pdf":
-                    return self._process_pdf(filepath)
-                elif file_extension in [".docx", ".doc"]:
-                    return self._process_word(filepath)
-                elif file_extension in [".png", ".jpg", ".jpeg"]:
-                    return self._process_image(filepath)
-                else:
-                    return f"[Unsupported file format: {file_extension}]"
-    
-            except Exception as e:
-                return f"[File processing error: {str(e)}]"
-    
-        # ------------------------
-        # File Type Processors
-        # ------------------------
-    
-        def _process_txt(self, filepath):
-            """Extract text from .txt files."""
-            try:
-                with open(filepath, "r", encoding="utf-8") as file:
-                    content = file.read()
-                return self._clean_text(content)
-            except UnicodeDecodeError:
-                try:
-                    with open(filepath, "r", encoding="latin-1") as file:
-                        content = file.read()
-                    return self._clean_text(content)
-                except Exception as e:
-                    return f"[Error reading TXT file: {str(e)}]"
-    
-        def _process_pdf(self, filepath):
-            """Extract text from PDF files."""
-            try:
-                with open(filepath, "rb") as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    content = ""
-                    for page in pdf_reader.pages:
-                        extracted = page.extract_text()
-                        if extracted:
-                            content += extracted + "\n"
-                return self._clean_text(content) if content else "[No text extracted from PDF]"
-            except Exception as e:
-                return f"[Error reading PDF: {str(e)}]"
-    
-        def _process_word(self, filepath):
-            """Extract text from Word documents (.docx and .doc)."""
-            try:
-                doc = Document(filepath)
-                content = ""
-    
-                # Extract paragraphs
-                for paragraph in doc.paragraphs:
-                    content += paragraph.text + "\n"
-    
-                # Extract tables
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            content += cell.text + " "
-                    content += "\n"
-    
-                return self._clean_text(content) if content else "[No text extracted from Word file]"
-            except Exception as e:
-                return f"[Error reading Word document: {str(e)}]"
-    
-        def _process_image(self, filepath):
-            """Extract text from image files using OCR (safe with timeout)."""
-            try:
-                with Image.open(filepath) as img:
-                    img = img.convert("RGB")  # ensure format is consistent
-                    # Add timeout to prevent hanging on large images
-                    content = pytesseract.image_to_string(img, timeout=30)
-                    cleaned = self._clean_text(content)
-                    return cleaned if cleaned else "[No text detected in image]"
-            except Exception as e:
-                # Be explicit when Tesseract is missing to help users
-                if "tesseract is not installed" in str(e).lower() or "not found" in str(e).lower():
-                    return "[OCR unavailable: Tesseract not found. Install Tesseract or set TESSERACT_CMD]"
-                return f"[Error reading image: {str(e)}]"
-    
-        # ------------------------
-        # Helpers
-        # ------------------------
-    
-        def _clean_text(self, text):
-            """Clean and normalize extracted text."""
-            if not text:
-                return ""
-    
-            # Remove extra whitespace
-            text = re.sub(r"\s+", " ", text)
-    
-            # Remove unwanted characters but keep punctuation
-            text = re.sub(r"[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]", "", text)
-    
-            # Normalize spaces
-            text = re.sub(r"\s+", " ", text)
-    
-            return text.strip()
-    
-        def get_document_summary(self, content, max_length=500):
-            """Generate a brief summary of the document content."""
-            if not content:
-                return "[No content available to summarize]"
-    
-            if len(content) <= max_length:
-                return content
-    
-            # Take first few sentences
-            sentences = content.split(".")
-            summary = ""
-            for sentence in sentences:
-                if len(summary + sentence) < max_length:
-                    summary += sentence.strip() + ". "
-                else:
-                    break
-    
-            return summary.strip()
-    
-    
-    
-    
-    
-    
-    doc_processor = DocumentProcessor()
-    
-    
-    
-    # ---------------------------
-    # Page Config
-    # ---------------------------
-    # st.set_page_config(page_title="LectureBuddies - AI Chatbot", page_icon="🤖", layout="wide", initial_sidebar_state="expanded")
-    
-    # ---------------------------
-    # Load API Key from .env
-    # ---------------------------
-    # (Already loaded globally via st.secrets check)
-    
+    """Display the AI chatbot with document upload and summarization"""
     if not api_key:
         st.error("⚠️ API key missing! Please check your .env file.")
         st.stop()
     
-    # ---------------------------
-    # Session Initialization
-    # ---------------------------
-    def init_session_state():
-        defaults = {
-            "messages": [],
-            "uploaded_files": [],
-            "document_contents": {}
-        }
-        for k, v in defaults.items():
-            if k not in st.session_state:
-                st.session_state[k] = v
-    
-    init_session_state()
-    
-    # ---------------------------
-    # Inject File Content Helper
-    # ---------------------------
-    def inject_file_content(user_message: str) -> str:
-        """
-        Replace file references in user message with extracted text,
-        so model never says 'I can't see images'.
-        """
-        for fname, content in st.session_state.document_contents.items():
-            if fname.lower() in user_message.lower():
-                extracted = content if content.strip() else "[No text extracted from this file]"
-                user_message = user_message.replace(
-                    fname,
-                    f"(Extracted content: {extracted[:1000]}...)"
-                )
-        return user_message
-    
     # ---------------------------
     # API Interaction
     # ---------------------------
-    def get_groq_response(user_input, model="llama-3.1-8b-instant"):
-    
-        """Send query + context to Groq API and return assistant response."""
-        if not api_key or api_key.strip() == "":
-            return "⚠️ Missing API key. Please set GROQ_API_KEY in your .env file."
-    
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    
-        # Build document context
-        doc_context = ""
-        if st.session_state.document_contents:
-            doc_context = "\n\n**Available Documents:**\n"
-            for fname, content in st.session_state.document_contents.items():
-                snippet = content[:1000] if content else "[No extractable text]"
-                doc_context += f"\n--- {fname} ---\n{snippet}...\n"
-    
-        # Build conversation
-        messages = [{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
+    def build_chat_messages(user_input):
+        """System prompt with document context + conversation + the new user turn."""
+        # Passages of the uploads most relevant to this question
+        doc_context = document_context(user_input)
+
         system_msg = (
             f"You are LectureBuddies, an AI chatbot designed for education. "
             f"Answer clearly, summarize effectively, and explain concepts step by step."
-            f"{' Available Documents: ' + doc_context if doc_context else ''}\n\n"
+            f"{doc_context}\n\n"
             "Guidelines:\n"
             "📚 Education-focused\n"
             "📝 Summarization expert\n"
@@ -1270,47 +1064,50 @@ def show_chatbot_feature():
             "✅ Confidence + accuracy\n"
             "Break down topics step-by-step, use examples, and stay professional yet supportive."
         )
-        messages.insert(0, {"role": "system", "content": system_msg})
-        messages.append({"role": "user", "content": user_input})
-    
-        payload = {"model": model, "messages": messages, "temperature": 0.7, "max_tokens": 1000}
-    
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=30)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data.get("choices", [{}])[0].get("message", {}).get("content", "⚠️ No response received.")
-            elif resp.status_code == 401:
-                return "❌ Invalid API key. Please check GROQ_API_KEY in your .env file."
-            elif resp.status_code == 429:
-                return "⏳ Too many requests. Please slow down and retry shortly."
-            else:
-                return f"⚠️ API Error {resp.status_code}: {resp.text}"
-        except requests.exceptions.Timeout:
-            return "⏳ Request timed out. Please retry."
-        except requests.exceptions.RequestException as e:
-            return f"🌐 Network error: {e}"
-        except Exception as e:
-            return f"⚠️ Unexpected error: {e}"
-    
-    # ---------------------------
-    # Document Processing
-    # ---------------------------
-    def process_document(uploaded_file):
-        """Extract text from uploaded documents (txt, pdf, docx, images with OCR)."""
+        # Recent turns verbatim, older ones as a rolling summary, within the token budget
+        return get_conversation().build(system_msg, chat_history(), user_input)
+
+    def describe_error(e):
+        icons = {"auth": "❌", "rate_limit": "⏳", "timeout": "⏳", "network": "🌐"}
+        return f"{icons.get(e.kind, '⚠️')} {e}"
+
+    def assistant_bubble(text):
+        return f"""
+                <div class="assistant-message">
+                    <div class="assistant-bubble">
+                        {text}
+                    </div>
+                </div>
+                """
+
+    def stream_groq_response(user_input, model="llama-3.1-8b-instant", cache=None):
+        """
+        Stream the reply into a live assistant bubble and return the full text.
+        Tokens show up as they arrive instead of after the whole completion;
+        if the script is interrupted (rerun, navigation) the stream is closed.
+        cache=True answers repeated requests from the response cache.
+        """
+        placeholder = st.empty()
+        placeholder.markdown(assistant_bubble("🤔 Thinking..."), unsafe_allow_html=True)
+        reply, last_render = "", 0.0
         try:
-            # Save the uploaded file temporarily
-            temp_path = os.path.join("temp", uploaded_file.name)
-            os.makedirs("temp", exist_ok=True)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.read())
-    
-            # Use your DocumentProcessor
-            content = doc_processor.process_document(temp_path)
-    
-            return content if content.strip() else "[No text extracted]"
+            stream = get_groq_client().stream_chat(
+                build_chat_messages(user_input), model=model, temperature=0.7, max_tokens=1000, cache=cache
+            )
+            with closing(stream):
+                for piece in stream:
+                    reply += piece
+                    # Re-rendering every token is wasteful; ~20 updates/sec looks live
+                    if time.perf_counter() - last_render > 0.05:
+                        placeholder.markdown(assistant_bubble(reply + "▌"), unsafe_allow_html=True)
+                        last_render = time.perf_counter()
+        except GroqError as e:
+            reply = f"{reply}\n\n{describe_error(e)}" if reply else describe_error(e)
         except Exception as e:
-            return f"[File processing error: {e}]"
+            reply = f"⚠️ Unexpected error: {e}"
+        reply = reply or "⚠️ No response received."
+        placeholder.markdown(assistant_bubble(reply), unsafe_allow_html=True)
+        return reply
     
     # ---------------------------
     # Enhanced Styling (Matching Quiz Generator Theme)
@@ -1492,7 +1289,18 @@ def show_chatbot_feature():
         
         if st.button("🗑️ Clear Chat", key="clear_chat", help="Start a new conversation"):
             st.session_state.messages.clear()
+            get_conversation().reset()
             st.rerun()
+
+        last_request = get_conversation().last_request
+        if last_request:
+            detail = f"{last_request['verbatim_turns']} recent turns verbatim"
+            if last_request["summarized_turns"]:
+                detail += f", {last_request['summarized_turns']} summarized ({last_request['summary']})"
+            st.caption(
+                f"🧮 Last request: ~{last_request['prompt_tokens']:,} tokens "
+                f"(full history: ~{last_request['full_tokens']:,}); {detail}"
+            )
         
         st.markdown("---")
         st.markdown("**📎 Upload Files**")
@@ -1510,7 +1318,10 @@ def show_chatbot_feature():
                 "filesize": sidebar_upload.size
             }
             with st.spinner(f"Processing {sidebar_upload.name}..."):
-                st.session_state.document_contents[sidebar_upload.name] = process_document(sidebar_upload)
+                content = process_document(sidebar_upload)
+                st.session_state.document_contents[sidebar_upload.name] = content
+                embed_document(sidebar_upload.name, content)
+                file_details["summary"] = get_document_processor().get_document_summary(content, max_length=300)
             st.session_state.uploaded_files.append(file_details)
             st.sidebar.success(f"✅ {sidebar_upload.name} uploaded!")
             st.rerun()
@@ -1530,6 +1341,9 @@ def show_chatbot_feature():
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     st.markdown(f"📄 {f['filename']}")
+                    if f.get("summary"):
+                        with st.expander("Preview"):
+                            st.caption(f["summary"])
                 with col2:
                     if st.button("🗑️", key=f"del_file_{i}", help="Remove file"):
                         fname = f['filename']
@@ -1568,10 +1382,11 @@ def show_chatbot_feature():
         for col, (label, prompt) in zip([col1, col2, col3], presets.items()):
             with col:
                 if st.button(label, key=label.replace(" ", "_").lower(), help="Start with this prompt"):
+                    # Answered below the conversation on the next run (streamed)
                     st.session_state.messages.append({"role": "user", "content": prompt})
-                    with st.spinner("🤔 Thinking..."):
-                        reply = get_groq_response(prompt)
-                    st.session_state.messages.append({"role": "assistant", "content": reply})
+                    st.session_state.pending_prompt = prompt
+                    # Same preset on a fresh chat = same request: serve it from the response cache
+                    st.session_state.pending_cache = True
                     st.rerun()
     
     # ---------------------------
@@ -1588,13 +1403,15 @@ def show_chatbot_feature():
                 </div>
                 """, unsafe_allow_html=True)
             else:
-                st.markdown(f"""
-                <div class="assistant-message">
-                    <div class="assistant-bubble">
-                        {msg['content']}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(assistant_bubble(msg['content']), unsafe_allow_html=True)
+
+    # Stream the answer to the latest user message right under it
+    pending_prompt = st.session_state.pop("pending_prompt", None)
+    pending_cache = st.session_state.pop("pending_cache", None)
+    if pending_prompt:
+        reply = stream_groq_response(pending_prompt, cache=pending_cache)
+        st.session_state.messages.append({"role": "assistant", "content": reply})
+        st.rerun()
     
     # ---------------------------
     # Chat Input (Professional Styling, Shorter Placeholder)
@@ -1605,9 +1422,7 @@ def show_chatbot_feature():
         final_input = inject_file_content(user_input.strip())
         
         st.session_state.messages.append({"role": "user", "content": user_input.strip()})
-        with st.spinner("🤔 Thinking..."):
-            reply = get_groq_response(final_input)
-        st.session_state.messages.append({"role": "assistant", "content": reply})
+        st.session_state.pending_prompt = final_input
         st.rerun()
     
     # ---------------------------
@@ -1692,7 +1507,7 @@ def show_quiz_feature():
             if st.button("✨ Generate Quiz from File", key="file-btn", help=f"Create {num_questions} {difficulty} questions"):
                 if uploaded_file:
                     content = extract_content_from_file(uploaded_file)
-                    if content and "Error" not in content:
+                    if content and not is_status_marker(content):
                         st.session_state.quiz_output = get_groq_quiz_response(content, num_questions, difficulty, model=st.session_state.quiz_model, temperature=st.session_state.quiz_temperature)
                     else:
                         st.error("Failed to extract content from file. Please try a different file or format.")
@@ -1965,8 +1780,9 @@ def show_flashcards_feature():
         if st.button("🎯 Generate Flash Cards", key="generate_cards", use_container_width=True):
             if content_input or uploaded_file:
                 with st.spinner("Generating flash cards..."):
-                    # Generate flash cards using AI
-                    flashcards = generate_flashcards(content_input or "Sample content", num_cards, difficulty, subject)
+                    # Generate flash cards using AI (pasted text wins over the uploaded file)
+                    content = content_input or extract_content_from_file(uploaded_file)
+                    flashcards = generate_flashcards(content or "Sample content", num_cards, difficulty, subject)
                     st.session_state.flashcards = flashcards
                     st.success(f"✅ Generated {len(flashcards)} flash cards!")
             else:
@@ -1982,9 +1798,6 @@ def generate_flashcards(content, num_cards, difficulty, subject):
     if not api_key:
         return [{"front": "Error: No API key", "back": "Please set GROQ_API_KEY in your .env file"}]
     
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    
     prompt = f"""
     Create {num_cards} flash cards from this content for {subject or 'general study'}.
     Difficulty level: {difficulty}
@@ -2003,16 +1816,12 @@ def generate_flashcards(content, num_cards, difficulty, subject):
         {"role": "user", "content": prompt}
     ]
     
-    payload = {"model": "llama-3.1-8b-instant", "messages": messages, "temperature": 0.7, "max_tokens": 1000}
-    
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            return parse_flashcards(content)
-        else:
-            return [{"front": "Error generating cards", "back": f"API Error: {response.status_code}"}]
+        # No creativity control here: same content and settings give the same deck from the response cache
+        content = get_groq_client().chat(messages, model="llama-3.1-8b-instant", temperature=0.7, max_tokens=1000, cache=True)
+        return parse_flashcards(content)
+    except GroqError as e:
+        return [{"front": "Error generating cards", "back": str(e)}]
     except Exception as e:
         return [{"front": "Error", "back": f"Failed to generate cards: {str(e)}"}]
 
@@ -2181,36 +1990,50 @@ def show_translation_feature():
                 mime="text/plain"
             )
 
+# Characters per translation request (~650 tokens in, fits a 1000-token reply)
+TRANSLATION_SEGMENT_CHARS = 2500
+MAX_TRANSLATION_SEGMENTS = 40
+
 def translate_text(text, target_language_label):
-    """Translate text using AI; auto-detect source language"""
+    """Translate text using AI; auto-detect source language. Long text is translated in segments, in parallel"""
     if not api_key:
         return "Error: No API key available"
-    
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    
-    prompt = (
-        f"Detect the source language and translate the following text to {target_language_label}. "
-        f"Only return the translated text, no explanations or prefixes.\n\n{text}"
-    )
-    
-    messages = [
-        {"role": "system", "content": "You are a professional translator. Translate accurately and naturally."},
-        {"role": "user", "content": prompt}
-    ]
-    
-    payload = {"model": "llama-3.1-8b-instant", "messages": messages, "temperature": 0.3, "max_tokens": 1000}
-    
+
+    segments = split_text(text, TRANSLATION_SEGMENT_CHARS)
+    if not segments:
+        return "Translation failed"
+    note = ""
+    if len(segments) > MAX_TRANSLATION_SEGMENTS:
+        segments = segments[:MAX_TRANSLATION_SEGMENTS]
+        note = f"\n\n[Translation limited to the first {MAX_TRANSLATION_SEGMENTS * TRANSLATION_SEGMENT_CHARS:,} characters]"
+
+    batch = []
+    for segment in segments:
+        prompt = (
+            f"Detect the source language and translate the following text to {target_language_label}. "
+            f"Only return the translated text, no explanations or prefixes.\n\n{segment}"
+        )
+        messages = [
+            {"role": "system", "content": "You are a professional translator. Translate accurately and naturally."},
+            {"role": "user", "content": prompt}
+        ]
+        batch.append({"messages": messages, "model": "llama-3.1-8b-instant", "temperature": 0.3, "max_tokens": 1000})
+
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("choices", [{}])[0].get("message", {}).get("content", "Translation failed")
-        else:
-            return f"Translation error: {response.status_code}"
+        # All segments at once: about as long as the slowest segment
+        results = run_parallel(batch)
     except Exception as e:
         return f"Translation failed: {str(e)}"
 
+    failures = [result for result in results if isinstance(result, GroqError)]
+    if len(failures) == len(results):
+        return f"Translation error: {failures[0]}"
+    parts = [
+        f"[Segment {index} not translated: {result}]" if isinstance(result, GroqError) else result
+        for index, result in enumerate(results, start=1)
+    ]
+    return "\n\n".join(parts) + note
+
 # ==========================
 # NOTES MANAGER FEATURE
 # ==========================
@@ -2368,6 +2191,19 @@ def show_admin_feature():
         st.metric("Total Users", "1,234")
         st.metric("Active Sessions", "45")
         st.metric("Storage Used", "2.3 GB")
+        doc_processor = get_document_processor()
+        cache_stats = doc_processor.cache_stats()
+        st.metric(
+            "Extraction Cache Hit Rate",
+            f"{cache_stats['hit_rate']:.0%}",
+            help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses",
+        )
+        ocr_stats = doc_processor.ocr_stats()
+        st.metric(
+            "Image OCR Success Rate",
+            f"{ocr_stats['success_rate']:.0%}",
+            help=f"{ocr_stats['images']} images, avg {ocr_stats['avg_seconds']:.1f}s, max {ocr_stats['max_seconds']:.1f}s",
+        )
     
     with col2:
         st.markdown("### 🎯 Feature Usage")
@@ -2380,6 +2216,31 @@ def show_admin_feature():
         st.metric("API Status", "✅ Online")
         st.metric("Database", "✅ Connected")
         st.metric("Storage", "✅ Available")
+        groq_stats = get_groq_client().stats()
+        st.metric(
+            "Chat Time to First Token",
+            f"{groq_stats['ttft_avg']:.2f}s" if groq_stats["ttft_avg"] is not None else "—",
+            help=f"{groq_stats['streams']} streamed replies, max {groq_stats['ttft_max']:.2f}s",
+        )
+        limiter_stats = groq_stats["limiter"]
+        st.metric(
+            "Groq Request Queue",
+            f"{limiter_stats['queue_depth']} waiting",
+            help=(
+                f"{limiter_stats['waited']} requests queued (avg {limiter_stats['wait_avg']:.2f}s, "
+                f"max {limiter_stats['wait_max']:.2f}s), {limiter_stats['rejected']} rejected; "
+                f"{groq_stats['throttled']} HTTP 429s, {groq_stats['retries']} retries"
+            ),
+        )
+        llm_cache_stats = get_groq_client().cache.stats()
+        st.metric(
+            "LLM Cache Hit Rate",
+            f"{llm_cache_stats['hit_rate']:.0%}",
+            help=(
+                f"{llm_cache_stats['hits']} hits / {llm_cache_stats['misses']} misses, "
+                f"{llm_cache_stats['bypassed']} bypassed, {llm_cache_stats['saved_seconds']:.1f}s of API latency saved"
+            ),
+        )
     
     st.markdown("---")
     
@@ -2614,39 +2475,127 @@ def show_offline_feature():
 # ==========================
 # HELPER FUNCTIONS
 # ==========================
+# Prompt budgets for document text, in estimated tokens (~4 characters each)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("LECTUREBUDDIES_CONTEXT_TOKENS", "1500"))
+FILE_TOKEN_BUDGET = int(os.getenv("LECTUREBUDDIES_FILE_TOKENS", "800"))
+
+def get_document_index():
+    """BM25 index over this session's uploads; only new or changed uploads are (re)indexed."""
+    if "document_index" not in st.session_state:
+        st.session_state.document_index = BM25Index()
+    index = st.session_state.document_index
+    index.sync({
+        fname: content for fname, content in st.session_state.document_contents.items()
+        if not is_status_marker(content)
+    })
+    return index
+
+def embed_document(fname, content):
+    """Add an upload to the shared vector index; returns its index key (None for failed extractions)."""
+    if is_status_marker(content):
+        return None
+    keys = st.session_state.setdefault("document_keys", {})
+    cached = keys.get(fname)
+    if cached is None or cached[0] is not content:
+        cached = keys[fname] = (content, content_key(content))
+    get_vector_index().add_document(cached[1], content)
+    return cached[1]
+
+def semantic_ranking(user_input, fnames=None, k=6):
+    """(file name, start, end) of the upload chunks closest in meaning to user_input, best first."""
+    names = {}
+    for fname, content in st.session_state.document_contents.items():
+        if fnames is None or fname in fnames:
+            key = embed_document(fname, content)
+            if key:
+                names[key] = fname
+    keys = st.session_state.get("document_keys", {})
+    for fname in [fname for fname in keys if fname not in st.session_state.document_contents]:
+        del keys[fname]
+    if not names:
+        return []
+    hits = get_vector_index().search(user_input, k, documents=names)
+    return [(names[key], start, end) for key, start, end, _ in hits]
+
+def document_context(user_input):
+    """System prompt section with the upload passages most relevant to user_input (BM25 + semantic)."""
+    if not st.session_state.document_contents:
+        return ""
+    doc_context = f" Available Documents: {', '.join(st.session_state.document_contents)}\n"
+    passages = get_document_index().retrieve(
+        user_input, token_budget=CONTEXT_TOKEN_BUDGET, also_ranked=semantic_ranking(user_input)
+    )
+    if passages:
+        doc_context += "\n**Relevant Passages:**\n" + format_passages(passages)
+    return doc_context
+
 def inject_file_content(user_message: str) -> str:
-    """Replace file references in user message with extracted text"""
+    """Replace file references in user message with the passages of that file most relevant to the message"""
     for fname, content in st.session_state.document_contents.items():
         if fname.lower() in user_message.lower():
-            extracted = content if content.strip() else "[No text extracted from this file]"
+            if not content.strip():
+                extracted = "[No text extracted from this file]"
+            elif is_status_marker(content):
+                extracted = content
+            else:
+                question = user_message.replace(fname, " ")
+                index = get_document_index()
+                if index.search(question, documents=[fname]):
+                    passages = index.retrieve(
+                        question, token_budget=FILE_TOKEN_BUDGET, documents=[fname],
+                        also_ranked=semantic_ranking(question, fnames=[fname]),
+                    )
+                    extracted = " ... ".join(passage.text for passage in passages)
+                else:
+                    # No keyword matches (e.g. "summarize notes.pdf"): use an extractive summary
+                    extracted = get_document_processor().get_document_summary(
+                        content, max_length=FILE_TOKEN_BUDGET * CHARS_PER_TOKEN
+                    )
             user_message = user_message.replace(
                 fname,
-                f"(Extracted content: {extracted[:1000]}...)"
+                f"(Extracted content: {extracted}...)"
             )
     return user_message
 
+# Estimated tokens per chat request (system prompt + summary + recent turns + question)
+CHAT_TOKEN_BUDGET = int(os.getenv("LECTUREBUDDIES_CHAT_TOKENS", "4000"))
+
+def summarize_conversation(previous_summary, new_turns):
+    """Fold new chat turns into the rolling summary (runs on a background thread, so no st.* calls)."""
+    messages = [
+        {"role": "system", "content": (
+            "You keep a running summary of a tutoring chat. Merge the new turns into the summary in under "
+            "150 words. Keep topics, definitions, facts the student shared and open questions; drop greetings."
+        )},
+        {"role": "user", "content": f"Summary so far:\n{previous_summary or '(none)'}\n\nNew turns:\n{new_turns}"},
+    ]
+    # Every summary is unique: keep them out of the response cache
+    return get_groq_client().chat(messages, temperature=0.2, max_tokens=300, cache=False)
+
+def get_conversation():
+    """This session's ConversationBuilder (rolling summary state lives here)."""
+    if "conversation" not in st.session_state:
+        st.session_state.conversation = ConversationBuilder(
+            token_budget=CHAT_TOKEN_BUDGET, summarize_fn=summarize_conversation
+        )
+    return st.session_state.conversation
+
+def chat_history():
+    """Earlier chat turns, without the pending user turn (which is sent separately with file content injected)."""
+    history = st.session_state.messages
+    if history and history[-1]["role"] == "user":
+        history = history[:-1]
+    return history
+
 def get_groq_response(user_input, model="llama-3.1-8b-instant", temperature=0.7):
     """Send query + context to Groq API and return assistant response"""
-    if not api_key or api_key.strip() == "":
-        return "Missing API key. Please set GROQ_API_KEY in your .env file."
-
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-    # Build document context
-    doc_context = ""
-    if st.session_state.document_contents:
-        doc_context = "\n\n**Available Documents:**\n"
-        for fname, content in st.session_state.document_contents.items():
-            snippet = content[:1000] if content else "[No extractable text]"
-            doc_context += f"\n--- {fname} ---\n{snippet}...\n"
-
-    # Build conversation
-    messages = [{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
+    # Passages of the uploads most relevant to this question
+    doc_context = document_context(user_input)
+
     system_msg = (
         f"You are LectureBuddies, an AI chatbot designed for education. "
         f"Answer clearly, summarize effectively, and explain concepts step by step."
-        f"{' Available Documents: ' + doc_context if doc_context else ''}\n\n"
+        f"{doc_context}\n\n"
         "Guidelines:\n"
         "Education-focused\n"
         "Summarization expert\n"
@@ -2654,47 +2603,27 @@ def get_groq_response(user_input, model="llama-3.1-8b-instant", temperature=0.7)
         "Confidence + accuracy\n"
         "Break down topics step-by-step, use examples, and stay professional yet supportive."
     )
-    messages.insert(0, {"role": "system", "content": system_msg})
-    messages.append({"role": "user", "content": user_input})
-
-    payload = {"model": model, "messages": messages, "temperature": float(temperature), "max_tokens": 1000}
+    messages = get_conversation().build(system_msg, chat_history(), user_input)
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
-        if resp.status_code == 200:
-            data = resp.json()
-            return data.get("choices", [{}])[0].get("message", {}).get("content", "No response received.")
-        elif resp.status_code == 401:
-            return "Invalid API key. Please check GROQ_API_KEY in your .env file."
-        elif resp.status_code == 429:
-            return "Too many requests. Please slow down and retry shortly."
-        else:
-            return f"API Error {resp.status_code}: {resp.text}"
-    except requests.exceptions.Timeout:
-        return "Request timed out. Please retry."
-    except requests.exceptions.RequestException as e:
-        return f"Network error: {e}"
+        reply = get_groq_client().chat(messages, model=model, temperature=temperature, max_tokens=1000)
+        return reply or "No response received."
+    except GroqError as e:
+        return str(e)
     except Exception as e:
         return f"Unexpected error: {e}"
 
-def process_document(uploaded_file, doc_processor):
+def process_document(uploaded_file, doc_processor=None):
     """Extract text from uploaded documents"""
     try:
-        temp_path = os.path.join("temp", uploaded_file.name)
-        os.makedirs("temp", exist_ok=True)
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.read())
-
-        content = doc_processor.process_document(temp_path)
-        return content if content.strip() else "[No text extracted]"
+        doc_processor = doc_processor or get_document_processor()
+        content = doc_processor.process_document(uploaded_file)
+        return content if content.strip() else StatusMarker("[No text extracted]")
     except Exception as e:
-        return f"[File processing error: {e}]"
+        return StatusMarker(f"[File processing error: {e}]")
 
 def get_groq_quiz_response(content, num_questions=5, difficulty="Medium", model="llama-3.1-8b-instant", temperature=0.7):
     """Send content to Groq API and get quiz questions back"""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
     difficulty_map = {"Easy": "simple and straightforward", "Medium": "balanced and informative", "Hard": "challenging and detailed"}
     diff_desc = difficulty_map.get(difficulty, "balanced")
 
@@ -2713,45 +2642,32 @@ def get_groq_quiz_response(content, num_questions=5, difficulty="Medium", model=
         {"role": "user", "content": f"Generate a quiz from this content:\n\n{content}"}
     ]
 
-    payload = {"model": model, "messages": messages, "temperature": float(temperature), "max_tokens": 1200}
+    if len(content) > QUIZ_SINGLE_CALL_CHARS:
+        # Long notes: questions per section in parallel, then deduplicated and spread across the document
+        progress = st.progress(0.0, text=f"Generating {num_questions} {difficulty} quiz questions...")
+        try:
+            return generate_quiz(
+                content, num_questions, difficulty, model=model, temperature=temperature,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Reading section {done} of {total}..."),
+            )
+        except Exception as e:
+            return f"Error: {str(e)}"
+        finally:
+            progress.empty()
 
     try:
         with st.spinner(f"Generating {num_questions} {difficulty} quiz questions..."):
-            resp = requests.post(url, headers=headers, json=payload, timeout=30)
-        if resp.status_code == 200:
-            data = resp.json()
-            return data.get("choices", [{}])[0].get("message", {}).get("content", "No response received.")
-        elif resp.status_code == 401:
-            return "Invalid API key. Please check GROQ_API_KEY in your .env file."
-        elif resp.status_code == 429:
-            return "Too many requests. Please retry shortly."
-        else:
-            return f"API Error {resp.status_code}: {resp.text}"
-    except requests.exceptions.Timeout:
-        return "Request timed out. Please retry."
+            # Cached only at low "Creativity" settings, so regenerating gives a new quiz
+            reply = get_groq_client().chat(messages, model=model, temperature=temperature, max_tokens=1200)
+        return reply or "No response received."
+    except GroqError as e:
+        return str(e)
     except Exception as e:
         return f"Error: {str(e)}"
 
 def extract_content_from_file(uploaded_file):
-    """Extract text content from uploaded file (PDF, DOCX, TXT)"""
-    file_type = uploaded_file.type if hasattr(uploaded_file, 'type') else uploaded_file.name.split('.')[-1].lower()
-
-    try:
-        if file_type == "application/pdf" or file_type.endswith('.pdf'):
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-            content = ""
-            for page in pdf_reader.pages:
-                text = page.extract_text() or ""
-                content += text + "\n"
-            return content.strip()
-        elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or file_type.endswith('.docx'):
-            doc = Document(io.BytesIO(uploaded_file.read()))
-            content = "\n".join([para.text for para in doc.paragraphs if para.text.strip()])
-            return content.strip()
-        else:  # TXT or other text-based
-            return uploaded_file.read().decode("utf-8", errors="ignore").strip()
-    except Exception as e:
-        return f"Error extracting content: {str(e)}"
+    """Extract text content from uploaded file (PDF, DOCX, TXT) with the shared processor"""
+    return get_document_processor().process_document(uploaded_file)
 
 # ==========================
 # MAIN APPLICATION LOGIC
@@ -0,0 +1,221 @@
+import io
+import os
+import threading
+
+import PyPDF2
+
+# Optional faster engines, used when installed
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+except ImportError:
+    PDFPage = None
+
+
+# Preference order for pdf_backend="auto": fastest first, PyPDF2 as the baseline
+AUTO_ORDER = ["pypdfium2", "pypdf2", "pdfminer"]
+
+# PDFium is not thread-safe; Streamlit sessions share one DocumentProcessor
+_pdfium_lock = threading.Lock()
+
+
+def _open_file(source):
+    if isinstance(source, str):
+        return open(source, "rb")
+    return io.BytesIO(source)
+
+
+class PyPDF2Backend:
+    """Baseline: pure-Python PyPDF2."""
+
+    name = "pypdf2"
+
+    def __init__(self, source):
+        self._file = _open_file(source)
+        try:
+            self._reader = PyPDF2.PdfReader(self._file)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        return len(self._reader.pages)
+
+    def page_text(self, index):
+        return self._reader.pages[index].extract_text() or ""
+
+    def close(self):
+        self._file.close()
+
+
+class PdfiumBackend:
+    """pypdfium2 (Chrome's PDFium): much faster, good reading order."""
+
+    name = "pypdfium2"
+
+    def __init__(self, source):
+        with _pdfium_lock:
+            self._pdf = pdfium.PdfDocument(source)
+
+    def __len__(self):
+        return len(self._pdf)
+
+    def page_text(self, index):
+        with _pdfium_lock:
+            page = self._pdf[index]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    return textpage.get_text_range()
+                finally:
+                    textpage.close()
+            finally:
+                page.close()
+
+    def close(self):
+        with _pdfium_lock:
+            self._pdf.close()
+
+
+class PdfminerBackend:
+    """pdfminer.six: slow, but the most careful layout analysis."""
+
+    name = "pdfminer"
+
+    def __init__(self, source):
+        self._file = _open_file(source)
+        try:
+            document = PDFDocument(PDFParser(self._file))
+            self._pages = list(PDFPage.create_pages(document))
+        except Exception:
+            self._file.close()
+            raise
+        self._resources = PDFResourceManager(caching=True)
+
+    def __len__(self):
+        return len(self._pages)
+
+    def page_text(self, index):
+        output = io.StringIO()
+        device = TextConverter(self._resources, output, laparams=LAParams())
+        try:
+            PDFPageInterpreter(self._resources, device).process_page(self._pages[index])
+        finally:
+            device.close()
+        return output.getvalue()
+
+    def close(self):
+        self._file.close()
+
+
+BACKENDS = {
+    "pypdf2": PyPDF2Backend,
+    "pypdfium2": PdfiumBackend,
+    "pdfminer": PdfminerBackend,
+}
+
+
+def available_backends():
+    """Names of the backends whose libraries are installed, in AUTO_ORDER."""
+    installed = {"pypdf2": True, "pypdfium2": pdfium is not None, "pdfminer": PDFPage is not None}
+    return [name for name in AUTO_ORDER if installed[name]]
+
+
+def resolve_backends(preference=None):
+    """
+    Ordered backend names for a preference: "auto" (or None, or the
+    LECTUREBUDDIES_PDF_BACKEND env var) or a backend name. The preferred
+    backend comes first and the other installed ones follow as per-page
+    fallbacks; a preferred backend that isn't installed is skipped.
+    """
+    preference = (preference or os.getenv("LECTUREBUDDIES_PDF_BACKEND") or "auto").lower()
+    if preference != "auto" and preference not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {preference} (choose from auto, {', '.join(BACKENDS)})")
+
+    names = available_backends()
+    if preference in names:
+        names.remove(preference)
+        names.insert(0, preference)
+    return names
+
+
+class PdfTextReader:
+    """
+    Page text from a PDF via a chain of backends.
+
+    The first backend that can open the file decides the page count. A page
+    that raises in one backend is retried in the next ones (opened lazily),
+    so one malformed page doesn't lose the document.
+    """
+
+    def __init__(self, source, backends=None):
+        self._source = source
+        self._names = list(backends or resolve_backends())
+        self._documents = {}
+        self.fallbacks = 0
+
+        errors = []
+        self.backend = None
+        for name in self._names:
+            document = self._document(name, errors)
+            if document is not None:
+                self.backend = name
+                self.page_count = len(document)
+                break
+        if self.backend is None:
+            raise errors[0] if errors else ValueError("No PDF backend available")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _document(self, name, errors=None):
+        """Open (once) and return the named backend's document, or None if it can't."""
+        if name not in self._documents:
+            try:
+                self._documents[name] = BACKENDS[name](self._source)
+            except Exception as e:
+                self._documents[name] = None
+                if errors is not None:
+                    errors.append(e)
+        return self._documents[name]
+
+    def page_text(self, index):
+        """Text of page index (0-based); raises only if every backend fails."""
+        error = None
+        start = self._names.index(self.backend)
+        for name in self._names[start:]:
+            document = self._document(name)
+            if document is None:
+                continue
+            try:
+                text = document.page_text(index)
+            except Exception as e:
+                error = error or e
+                continue
+            if name != self.backend:
+                self.fallbacks += 1
+            return text
+        raise error
+
+    def iter_pages(self, start=0, stop=None):
+        """Yield page texts for pages [start, stop)."""
+        for index in range(start, self.page_count if stop is None else min(stop, self.page_count)):
+            yield self.page_text(index)
+
+    def close(self):
+        for document in self._documents.values():
+            if document is not None:
+                document.close()
+        self._documents.clear()
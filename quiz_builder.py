@@ -0,0 +1,200 @@
+"""
+Map-reduce quiz generation for long documents.
+
+    map:    split the content into sections and ask for a few candidate
+            MCQs per section, all sections in parallel (llm_fanout)
+    reduce: parse the candidates, drop near-duplicates, then pick
+            round-robin across sections so the quiz covers the whole
+            document, and renumber into one quiz
+
+Wall-clock time stays close to one call because the sections run
+concurrently; only a short top-up round runs when too few questions
+survive deduplication.
+"""
+import math
+import re
+
+from llm_fanout import run_parallel
+from groq_client import GroqError
+from retrieval import split_text
+
+
+# Characters of content per section prompt (~1,500 tokens)
+SECTION_CHARS = 6000
+# Sections per quiz; longer documents use evenly spaced sections
+MAX_SECTIONS = 12
+# Content up to this size goes to the model in one call
+SINGLE_CALL_CHARS = 8000
+# Questions whose word-trigram sets overlap at least this much are duplicates
+DUPLICATE_JACCARD = 0.6
+
+_DIFFICULTY = {"Easy": "simple and straightforward", "Medium": "balanced and informative", "Hard": "challenging and detailed"}
+
+_QUESTION_START = re.compile(r"^\s*(?:\*\*)?\s*(?:Q(?:uestion)?\s*\d*\s*[:.)]|\d+\s*[.)])\s*(?:\*\*)?\s*(.*)$", re.IGNORECASE)
+_OPTION = re.compile(r"^\s*(?:\*\*)?\s*\(?([A-D])\s*[).:]\s*(?:\*\*)?\s*(.+?)\s*$")
+_CORRECT = re.compile(r"correct(?:\s+answer)?\s*(?:is)?\s*[:\-]?\s*\**\s*\(?([A-D])\b", re.IGNORECASE)
+_WORD = re.compile(r"[^\W_]+")
+
+
+def section_requests(content, num_questions, difficulty="Medium", model="llama-3.1-8b-instant", temperature=0.7):
+    """(sections, chat requests) for the map step: one request per section, a few extra questions each."""
+    sections = split_text(content, SECTION_CHARS)
+    if len(sections) > MAX_SECTIONS:
+        step = (len(sections) - 1) / (MAX_SECTIONS - 1)
+        sections = [sections[round(index * step)] for index in range(MAX_SECTIONS)]
+    # Over-generate so deduplication and round-robin still leave enough
+    per_section = min(6, max(2, math.ceil(1.5 * num_questions / max(1, len(sections)))))
+    requests = [
+        _request(section, per_section, difficulty, model, temperature, index + 1, len(sections))
+        for index, section in enumerate(sections)
+    ]
+    return sections, requests
+
+
+def _request(section, count, difficulty, model, temperature, part, parts, avoid=None):
+    system_msg = (
+        "You are LectureBuddies Quiz Generator. "
+        f"Write exactly {count} multiple-choice questions about the given part of a document. "
+        f"Make them {_DIFFICULTY.get(difficulty, 'balanced')} in difficulty and answerable from this part alone. "
+        "Use exactly this format for every question, with no other text:\n"
+        "Q: <question>\nA) <option>\nB) <option>\nC) <option>\nD) <option>\nCorrect: <letter>"
+    )
+    user_msg = f"Part {part} of {parts} of the document:\n\n{section}"
+    if avoid:
+        user_msg += "\n\nDo not repeat these questions:\n" + "\n".join(f"- {question}" for question in avoid)
+    return {
+        "messages": [{"role": "system", "content": system_msg}, {"role": "user", "content": user_msg}],
+        "model": model, "temperature": temperature, "max_tokens": 250 * count,
+    }
+
+
+def parse_questions(text):
+    """MCQs in a reply as dicts with question, options (letter -> text) and answer; malformed ones are dropped."""
+    questions, current = [], None
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        start = _QUESTION_START.match(line)
+        option = _OPTION.match(line)
+        correct = _CORRECT.search(line)
+        if start and not option:
+            current = {"question": start.group(1).strip().strip("*").strip(), "options": {}, "answer": None}
+            questions.append(current)
+        elif current is None:
+            continue
+        elif option and option.group(1) not in current["options"] and not correct:
+            current["options"][option.group(1)] = option.group(2).strip("*").strip()
+        elif correct:
+            current["answer"] = correct.group(1).upper()
+        elif not current["options"]:
+            current["question"] = f"{current['question']} {line.strip()}".strip()
+    return [
+        question for question in questions
+        if question["question"] and len(question["options"]) == 4 and question["answer"] in question["options"]
+    ]
+
+
+def _shingles(question):
+    words = _WORD.findall(f"{question['question']} {question['options'][question['answer']]}".lower())
+    if len(words) < 3:
+        return {" ".join(words)}
+    return {" ".join(words[index:index + 3]) for index in range(len(words) - 2)}
+
+
+def dedupe(per_section, threshold=DUPLICATE_JACCARD, seen=None):
+    """
+    Drop questions whose word-trigram Jaccard similarity (question plus
+    correct answer) with an earlier kept question reaches threshold.
+    per_section is a list of question lists; the structure is kept.
+    """
+    seen = list(seen or [])
+    kept_sections = []
+    for questions in per_section:
+        kept = []
+        for question in questions:
+            shingles = _shingles(question)
+            if any(len(shingles & other) / len(shingles | other) >= threshold for other in seen):
+                continue
+            seen.append(shingles)
+            kept.append(question)
+        kept_sections.append(kept)
+    return kept_sections, seen
+
+
+def pick_round_robin(per_section, count):
+    """
+    Up to count questions taken one per section in turn, in document order.
+    When a round has more sections than places left, evenly spaced sections
+    from the first to the last are used, so no end of the document is left out.
+
+    >>> pick_round_robin([[1], [2], [3], [4], [5], [6], [7]], 5)
+    [1, 3, 4, 5, 7]
+    """
+    picked, depth = [], 0
+    while len(picked) < count:
+        round_ = [(index, questions[depth]) for index, questions in enumerate(per_section) if depth < len(questions)]
+        if not round_:
+            break
+        left = count - len(picked)
+        if len(round_) > left:
+            round_ = [round_[round(slot * (len(round_) - 1) / max(1, left - 1))] for slot in range(left)]
+        picked.extend(round_)
+        depth += 1
+    return [question for _, question in sorted(picked, key=lambda item: item[0])]
+
+
+def format_quiz(questions, difficulty):
+    """Numbered quiz with bold questions, labeled options and an answer summary."""
+    lines = [f"Quiz: {len(questions)} {difficulty} questions", ""]
+    for number, question in enumerate(questions, start=1):
+        lines.append(f"**{number}. {question['question']}**")
+        lines.append("")
+        lines.extend(f"{letter}) {question['options'][letter]}  " for letter in "ABCD")
+        lines.append("")
+        lines.append(f"Correct: {question['answer']}")
+        lines.append("")
+    lines.append("**Answer Summary:** " + ", ".join(f"{number}-{question['answer']}" for number, question in enumerate(questions, start=1)))
+    return "\n".join(lines)
+
+
+def generate_quiz(content, num_questions, difficulty="Medium", model="llama-3.1-8b-instant", temperature=0.7, on_progress=None):
+    """
+    Map-reduce quiz over the whole content. Returns the formatted quiz, or
+    an error string when no section produced usable questions.
+    on_progress(done, total) is called as sections finish.
+    """
+    sections, requests = section_requests(content, num_questions, difficulty, model, temperature)
+    finished = []
+
+    def progress(index, result):
+        finished.append(index)
+        if on_progress is not None:
+            on_progress(len(finished), len(requests))
+
+    results = run_parallel(requests, on_result=progress)
+    failures = [result for result in results if isinstance(result, GroqError)]
+    per_section = [[] if isinstance(result, GroqError) else parse_questions(result) for result in results]
+    per_section, seen = dedupe(per_section)
+
+    missing = num_questions - sum(len(questions) for questions in per_section)
+    if missing > 0:
+        # Top-up round on the sections with the fewest questions, told what already exists
+        order = sorted(range(len(sections)), key=lambda index: len(per_section[index]))[:missing]
+        existing = [question["question"] for questions in per_section for question in questions][:30]
+        extra = max(2, math.ceil(missing / max(1, len(order))))
+        top_up = [
+            _request(sections[index], extra, difficulty, model, temperature, index + 1, len(sections), avoid=existing)
+            for index in order
+        ]
+        for index, result in zip(order, run_parallel(top_up)):
+            if not isinstance(result, GroqError):
+                added, seen = dedupe([parse_questions(result)], seen=seen)
+                per_section[index].extend(added[0])
+
+    picked = pick_round_robin(per_section, num_questions)
+    if not picked:
+        return str(failures[0]) if failures else "Error: the model did not return any usable questions. Please retry."
+    quiz = format_quiz(picked, difficulty)
+    if len(picked) < num_questions:
+        quiz += f"\n\n_Only {len(picked)} distinct questions could be generated from this document._"
+    return quiz
@@ -0,0 +1,238 @@
+import math
+import re
+from array import array
+from collections import Counter, deque, namedtuple
+
+import numpy as np
+
+from summarizer import STOPWORDS
+
+
+_TOKEN = re.compile(r"[^\W_]{2,}")
+_WORD = re.compile(r"\S+")
+
+# Rough average for English text with Llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# One retrieved piece of a document; start/end index into that document's text
+Passage = namedtuple("Passage", ["document", "text", "start", "end", "score"])
+
+
+def estimate_tokens(text):
+    """Cheap token count estimate (about 4 characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def tokenize(text):
+    """Lower-cased terms of text without stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_spans(text, words=120, overlap=30):
+    """
+    Yield (start, end) character spans of overlapping word windows.
+
+    Extracted text is normalized to single spaces, so there are no reliable
+    paragraph breaks left; windows of about a paragraph's length stand in for
+    them. The overlap keeps a passage that straddles a boundary whole in at
+    least one chunk.
+    """
+    step = max(1, words - overlap)
+    window = deque()  # (start, end) of each word in the current window
+    emitted_end = 0
+    for match in _WORD.finditer(text):
+        window.append(match.span())
+        if len(window) == words:
+            yield window[0][0], window[-1][1]
+            emitted_end = window[-1][1]
+            for _ in range(step):
+                window.popleft()
+    if window and window[-1][1] > emitted_end:
+        yield window[0][0], window[-1][1]
+
+
+# Preferred cut points for split_text, best first
+_BREAKS = (re.compile(r"\n\s*\n"), re.compile(r"(?<=[.!?])\s+"), re.compile(r"\s+"))
+
+
+def split_text(text, max_chars=3000):
+    """
+    Split text into consecutive pieces of at most max_chars, each cut at
+    the last paragraph break, else sentence end, else whitespace in the
+    second half of the window. For prompts that must each see whole
+    sentences (translation segments, per-chunk quizzes).
+    """
+    pieces, start = [], 0
+    while len(text) - start > max_chars:
+        cut = None
+        for pattern in _BREAKS:
+            for match in pattern.finditer(text, start + max_chars // 2, start + max_chars):
+                cut = match
+            if cut is not None:
+                break
+        end, next_start = (cut.start(), cut.end()) if cut is not None else (start + max_chars, start + max_chars)
+        pieces.append(text[start:end])
+        start = next_start
+    pieces.append(text[start:])
+    return [piece for piece in pieces if piece.strip()]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over word-window chunks of several documents.
+
+    Postings are flat integer arrays per term and chunk text is sliced from
+    the document only when a passage is returned, so the index adds a few
+    bytes per term occurrence on top of the texts it points into. Documents
+    are added incrementally; sync() rebuilds only when one is removed or
+    replaced.
+    """
+
+    def __init__(self, chunk_words=120, overlap=30, k1=1.5, b=0.75):
+        self.chunk_words = chunk_words
+        self.overlap = overlap
+        self.k1 = k1
+        self.b = b
+        self.clear()
+
+    def clear(self):
+        self.names = []           # document names, indexed by document id
+        self.texts = []
+        self._fingerprints = {}   # name -> (length, hash) of the indexed text
+        self.chunk_documents = array("i")  # document id of each chunk
+        self.chunk_starts = array("q")
+        self.chunk_ends = array("q")
+        self.chunk_lengths = array("i")    # terms per chunk
+        self.postings = {}        # term -> (chunk ids, term frequencies)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.chunk_starts)
+
+    def add_document(self, name, text):
+        """Chunk and index one document (name must not be indexed already)."""
+        document = len(self.names)
+        self.names.append(name)
+        self.texts.append(text)
+        self._fingerprints[name] = (len(text), hash(text))
+
+        for start, end in chunk_spans(text, self.chunk_words, self.overlap):
+            chunk = len(self.chunk_starts)
+            terms = tokenize(text[start:end])
+            self.chunk_documents.append(document)
+            self.chunk_starts.append(start)
+            self.chunk_ends.append(end)
+            self.chunk_lengths.append(len(terms))
+            self._total_length += len(terms)
+            for term, count in Counter(terms).items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array("q"), array("i"))
+                posting[0].append(chunk)
+                posting[1].append(count)
+
+    def sync(self, documents):
+        """
+        Bring the index in line with {name: text}. Unchanged documents are
+        not re-chunked; returns True if anything was (re)indexed.
+        """
+        fingerprints = {name: (len(text), hash(text)) for name, text in documents.items()}
+        if fingerprints == self._fingerprints:
+            return False
+        if any(fingerprints.get(name) != fingerprint for name, fingerprint in self._fingerprints.items()):
+            self.clear()
+        for name, text in documents.items():
+            if name not in self._fingerprints:
+                self.add_document(name, text)
+        return True
+
+    # ------------------------
+    # Search
+    # ------------------------
+
+    def search(self, query, k=6, documents=None):
+        """Top k (chunk id, score) pairs for query, best first. documents limits the search to those names."""
+        n = len(self)
+        terms = set(tokenize(query))
+        if not n or not terms:
+            return []
+
+        lengths = np.frombuffer(self.chunk_lengths, dtype=np.int32)
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / max(self._total_length / n, 1e-9))
+        scores = np.zeros(n)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            chunks = np.frombuffer(posting[0], dtype=np.int64)
+            counts = np.frombuffer(posting[1], dtype=np.int32)
+            idf = math.log(1 + (n - len(chunks) + 0.5) / (len(chunks) + 0.5))
+            scores[chunks] += idf * counts * (self.k1 + 1) / (counts + length_norm[chunks])
+
+        if documents is not None:
+            allowed = [index for index, name in enumerate(self.names) if name in documents]
+            scores[~np.isin(np.frombuffer(self.chunk_documents, dtype=np.int32), allowed)] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(chunk), float(scores[chunk])) for chunk in candidates]
+
+    def retrieve(self, query, k=6, token_budget=1500, documents=None, also_ranked=None):
+        """
+        The best passages for query that fit in token_budget, in document
+        order. Overlapping chunks of the same document are merged so no text
+        goes into the prompt twice.
+
+        also_ranked is a best-first list of (document name, start, end)
+        spans from another retriever (e.g. VectorIndex); it is combined with
+        the BM25 ranking by reciprocal rank fusion.
+        """
+        ranked = [
+            (self.names[self.chunk_documents[chunk]], self.chunk_starts[chunk], self.chunk_ends[chunk], score)
+            for chunk, score in self.search(query, k, documents)
+        ]
+        if also_ranked:
+            ranked = reciprocal_rank_fusion([[span[:3] for span in ranked], also_ranked])[:k]
+
+        positions = {name: index for index, name in enumerate(self.names)}
+        chosen, used = [], 0
+        for name, start, end, score in ranked:
+            if name not in positions:
+                continue
+            cost = (end - start) // CHARS_PER_TOKEN + 1
+            if used + cost > token_budget:
+                continue
+            chosen.append((positions[name], start, end, score))
+            used += cost
+
+        merged = []
+        for document, start, end, score in sorted(chosen):
+            if merged and merged[-1][0] == document and start <= merged[-1][2]:
+                previous = merged[-1]
+                merged[-1] = (document, previous[1], max(end, previous[2]), max(score, previous[3]))
+            else:
+                merged.append((document, start, end, score))
+        return [
+            Passage(self.names[document], self.texts[document][start:end], start, end, score)
+            for document, start, end, score in merged
+        ]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge best-first rankings of (document, start, end) spans: each span
+    scores sum(1 / (k + rank)) over the rankings it appears in. Returns
+    (document, start, end, score) best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, span in enumerate(ranking, start=1):
+            scores[span] = scores.get(span, 0.0) + 1.0 / (k + rank)
+    return [span + (score,) for span, score in sorted(scores.items(), key=lambda item: -item[1])]
+
+
+def format_passages(passages):
+    """Prompt text for retrieved passages, each headed by its file name."""
+    return "".join(f"\n--- {passage.document} ---\n{passage.text}\n" for passage in passages)
@@ -0,0 +1,128 @@
+import re
+
+import numpy as np
+
+
+# Sentence boundaries: terminal punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_TOKEN = re.compile(r"[^\W_]{2,}")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers him his how i if in into is it its itself just me more most my
+no nor not now of off on once only or other our ours out over own same she should so some such
+than that the their theirs them then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def split_sentences(text):
+    """Split text into sentences on ., ! and ? followed by whitespace."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def _sentence_term_matrix(sentences):
+    """
+    Sparse TF-IDF matrix in coordinate form (rows, cols, values) with
+    L2-normalized rows. One pass over the tokens; everything after that is
+    vectorized, so cost grows with the number of non-zeros.
+    """
+    vocabulary = {}
+    rows, cols = [], []
+    for index, sentence in enumerate(sentences):
+        for token in _TOKEN.findall(sentence.lower()):
+            if token not in STOPWORDS:
+                rows.append(index)
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    n_sentences, n_terms = len(sentences), max(len(vocabulary), 1)
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), n_terms
+
+    # Merge repeated (sentence, term) pairs into term frequencies
+    pairs, counts = np.unique(np.asarray(rows, dtype=np.int64) * n_terms + np.asarray(cols, dtype=np.int64), return_counts=True)
+    rows, cols = pairs // n_terms, pairs % n_terms
+
+    document_frequency = np.bincount(cols, minlength=n_terms)
+    idf = np.log((1 + n_sentences) / (1 + document_frequency)) + 1.0
+    values = (1.0 + np.log(counts)) * idf[cols]
+
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_sentences))
+    values = values / norms[rows]
+    return rows, cols, values, n_terms
+
+
+def score_sentences(sentences, damping=0.85, iterations=30):
+    """
+    TextRank over the cosine-similarity graph of TF-IDF sentence vectors,
+    personalized towards the document centroid.
+
+    The similarity matrix S = X X^T is never materialized: each power
+    iteration computes X (X^T v) from the sparse coordinates, which keeps the
+    whole ranking linear in the number of non-zeros instead of quadratic in
+    the number of sentences.
+    """
+    n = len(sentences)
+    rows, cols, values, n_terms = _sentence_term_matrix(sentences)
+    if n == 0 or values.size == 0:
+        return np.zeros(n)
+
+    def x_dot(vector):  # X @ vector, vector over terms
+        return np.bincount(rows, weights=values * vector[cols], minlength=n)
+
+    def xt_dot(vector):  # X.T @ vector, vector over sentences
+        return np.bincount(cols, weights=values * vector[rows], minlength=n_terms)
+
+    # Rows are unit length, so diag(S) is 1 for sentences with any terms
+    self_similarity = (np.bincount(rows, minlength=n) > 0).astype(float)
+    degree = x_dot(xt_dot(np.ones(n))) - self_similarity
+
+    # Centroid similarity: how representative each sentence is of the whole text
+    centroid = x_dot(xt_dot(np.ones(n)) / n)
+    personalization = centroid / centroid.sum() if centroid.sum() > 0 else np.full(n, 1.0 / n)
+
+    rank = np.full(n, 1.0 / n)
+    safe_degree = np.where(degree > 0, degree, 1.0)
+    for _ in range(iterations):
+        spread = np.where(degree > 0, rank / safe_degree, 0.0)
+        updated = (1 - damping) * personalization + damping * (x_dot(xt_dot(spread)) - self_similarity * spread)
+        total = updated.sum()
+        if total <= 0:
+            break
+        updated /= total
+        if np.abs(updated - rank).sum() < 1e-6:
+            rank = updated
+            break
+        rank = updated
+    return rank
+
+
+def summarize(text, max_length=500):
+    """
+    Extractive summary of at most max_length characters: the highest ranked
+    sentences, kept in their original order.
+    """
+    if not text:
+        return ""
+    if len(text) <= max_length:
+        return text
+
+    sentences = split_sentences(text)
+    scores = score_sentences(sentences)
+
+    chosen, used = [], 0
+    for index in np.argsort(-scores, kind="stable"):
+        length = len(sentences[index]) + (1 if chosen else 0)
+        if used + length <= max_length:
+            chosen.append(index)
+            used += length
+        if max_length - used < 20:
+            break
+
+    if not chosen:
+        # Every sentence is longer than the budget: cut the best one at a word boundary
+        best = sentences[int(np.argmax(scores))] if len(sentences) else text
+        return best[:max(0, max_length - 3)].rsplit(" ", 1)[0] + "..."
+    return " ".join(sentences[index] for index in sorted(chosen))
@@ -0,0 +1,76 @@
+import re
+
+
+# Characters kept besides word characters and whitespace (same set as the
+# original three-pass _clean_text)
+_KEEP_PUNCTUATION = ".,!?;:-()[]{}"
+
+# Non-ASCII input: drop every character that is not a word char, whitespace
+# or kept punctuation, in one compiled pass
+_DISALLOWED = re.compile(r"[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]+")
+
+# ASCII input: the same filter as a str.translate table, which runs in C
+_ASCII_DELETE_TABLE = {
+    code: None
+    for code in range(128)
+    if not (chr(code).isalnum() or chr(code) == "_" or chr(code).isspace() or chr(code) in _KEEP_PUNCTUATION)
+}
+
+# Large strings are normalized in slices so temporary word lists stay small
+_SLICE_CHARS = 64 * 1024
+
+
+class TextNormalizer:
+    """
+    Incremental text normalizer.
+
+    Produces exactly what the old _clean_text did (collapse whitespace to single
+    spaces, drop characters outside word chars and basic punctuation, strip),
+    but in a single filtering pass per piece, and it can be fed arbitrary
+    slices of a document: feed() returns the normalized text for each piece,
+    handling whitespace that straddles piece boundaries.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._pending_space = False
+
+    def feed(self, text):
+        """Normalize the next piece of a document and return it."""
+        if not text:
+            return ""
+
+        if text.isascii():
+            filtered = text.translate(_ASCII_DELETE_TABLE)
+        else:
+            filtered = _DISALLOWED.sub("", text)
+
+        # split() collapses whitespace runs and drops the ends in one C call
+        words = filtered.split()
+        if not words:
+            if filtered:
+                self._pending_space = True  # whitespace-only piece
+            return ""
+
+        separator = " " if self._started and (self._pending_space or filtered[0].isspace()) else ""
+        self._started = True
+        self._pending_space = filtered[-1].isspace()
+        return separator + " ".join(words)
+
+    def reset(self):
+        """Start a new document."""
+        self._started = False
+        self._pending_space = False
+
+
+def normalize_text(text):
+    """Normalize a whole string (see TextNormalizer)."""
+    if not text:
+        return ""
+    normalizer = TextNormalizer()
+    if len(text) <= _SLICE_CHARS:
+        return normalizer.feed(text)
+    return "".join(
+        normalizer.feed(text[start:start + _SLICE_CHARS])
+        for start in range(0, len(text), _SLICE_CHARS)
+    )
@@ -0,0 +1,318 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from retrieval import chunk_spans, tokenize
+
+
+# Default on-disk location; override with LECTUREBUDDIES_VECTOR_DIR
+_DEFAULT_INDEX_DIR = os.path.join(".cache", "vectors")
+
+# Rows of the vector matrix multiplied per block, which bounds the size of
+# the score matrix for batched queries
+_SEARCH_BLOCK_ROWS = 65536
+
+
+def content_key(text):
+    """Index key of a document: the SHA-1 of its extracted text."""
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class HashingEmbedder:
+    """
+    Offline text embeddings: hashing-trick TF-IDF followed by a fixed
+    Gaussian random projection to `dim` dimensions.
+
+    Features are the words of the text plus the character trigrams of each
+    word, so inflections and compounds ("produce", "produces", "production")
+    land close together even when the words differ. Hashing uses CRC-32, not
+    hash(), so vectors stay valid across processes.
+    """
+
+    def __init__(self, n_features=2 ** 14, dim=128, seed=0):
+        self.n_features = n_features
+        self.dim = dim
+        rng = np.random.default_rng(seed)
+        self.projection = (rng.standard_normal((n_features, dim)) / np.sqrt(dim)).astype(np.float32)
+        self._word_features = {}
+
+    def _features_of(self, word):
+        features = self._word_features.get(word)
+        if features is None:
+            padded = f"<{word}>"
+            grams = [word] + ["#" + padded[i:i + 3] for i in range(len(padded) - 2)]
+            features = [zlib.crc32(gram.encode("utf-8")) % self.n_features for gram in grams]
+            if len(self._word_features) < 200000:
+                self._word_features[word] = features
+        return features
+
+    def term_counts(self, text):
+        """(feature ids, counts) of text as int arrays."""
+        counts = Counter()
+        for word, count in Counter(tokenize(text)).items():
+            for feature in self._features_of(word):
+                counts[feature] += count
+        return np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)), np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+    def embed(self, texts, idf):
+        """Unit-length float32 vectors, one row per text (zero rows for texts without terms)."""
+        return self.embed_counts([self.term_counts(text) for text in texts], idf)
+
+    def embed_counts(self, term_counts, idf):
+        """embed() for texts already turned into term_counts()."""
+        vectors = np.zeros((len(term_counts), self.dim), dtype=np.float32)
+        for row, (features, counts) in enumerate(term_counts):
+            if not features.size:
+                continue
+            weights = (1.0 + np.log(counts)) * idf[features]
+            vector = weights @ self.projection[features]
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vectors[row] = vector / norm
+        return vectors
+
+
+class VectorIndex:
+    """
+    Persistent semantic index of document chunks.
+
+    - Vectors: one float32 row per chunk in vectors.npy, opened as a memory
+      map. The file is preallocated with spare rows and doubled when full,
+      so adding a document writes only its own rows.
+    - Metadata: SQLite table of documents (key, first chunk, chunk count)
+      and the document frequencies used for IDF.
+
+    Documents are keyed by content_key(text), so a lecture uploaded by many
+    students is embedded once. IDF weights are taken from everything indexed
+    so far when a document is added; earlier vectors are not re-weighted.
+    Chunks are the same word windows BM25Index uses, so results from both
+    can be fused span for span.
+    """
+
+    def __init__(self, index_dir=None, dim=128, n_features=2 ** 14, seed=0, chunk_words=120, overlap=30):
+        self.index_dir = index_dir or os.getenv("LECTUREBUDDIES_VECTOR_DIR", _DEFAULT_INDEX_DIR)
+        self.chunk_words = chunk_words
+        self.overlap = overlap
+        self.embedder = HashingEmbedder(n_features, dim, seed)
+        self._settings = f"{dim}:{n_features}:{seed}:{chunk_words}:{overlap}"
+
+        self._lock = threading.Lock()
+        self._store = np.zeros((0, dim), dtype=np.float32)   # rows incl. spare capacity
+        self.count = 0
+        self.documents = {}            # key -> (first chunk, chunk count)
+        self.chunk_starts = array("q")
+        self.chunk_ends = array("q")
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.chunks_seen = 0
+
+        self._db = None
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.index_dir, "index.sqlite3"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " key TEXT PRIMARY KEY,"
+                " first_chunk INTEGER NOT NULL,"
+                " chunk_count INTEGER NOT NULL,"
+                " spans BLOB NOT NULL)"
+            )
+            self._db.commit()
+            self._load()
+        except (sqlite3.Error, OSError, ValueError):
+            # Read-only or broken index dir: keep working in memory only
+            self._db = None
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.index_dir, "vectors.npy")
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return key in self.documents
+
+    @property
+    def vectors(self):
+        """float32 matrix (chunks x dim) of unit-length chunk vectors."""
+        return self._store[:self.count]
+
+    def _idf(self):
+        return (np.log((1.0 + self.chunks_seen) / (1.0 + self.document_frequency)) + 1.0).astype(np.float32)
+
+    # ------------------------
+    # Persistence
+    # ------------------------
+
+    def _meta(self, name):
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _load(self):
+        """Open the stored index, or start a new one when settings differ or files are missing."""
+        if self._meta("settings") != self._settings or not os.path.exists(self.vectors_path):
+            self._db.execute("DELETE FROM documents")
+            self._db.execute("DELETE FROM meta")
+            self._db.execute("INSERT INTO meta VALUES ('settings', ?)", (self._settings,))
+            self._db.commit()
+            return
+
+        count = int(self._meta("count") or 0)
+        store = np.load(self.vectors_path, mmap_mode="r+")
+        if store.shape[1] != self.embedder.dim or store.shape[0] < count:
+            raise ValueError("vector file does not match the index metadata")
+
+        rows = self._db.execute("SELECT key, first_chunk, chunk_count, spans FROM documents ORDER BY first_chunk").fetchall()
+        for key, first, chunks, spans in rows:
+            if first + chunks > count:
+                continue  # written after the last committed count (interrupted add)
+            offsets = np.frombuffer(zlib.decompress(spans), dtype=np.int64)
+            self.documents[key] = (first, chunks)
+            self.chunk_starts.extend(offsets[0::2].tolist())
+            self.chunk_ends.extend(offsets[1::2].tolist())
+        self._store = store
+        self.count = len(self.chunk_starts)
+        frequency = self._meta("document_frequency")
+        if frequency is not None:
+            self.document_frequency = np.frombuffer(zlib.decompress(frequency), dtype=np.int64).copy()
+        self.chunks_seen = int(self._meta("chunks_seen") or 0)
+
+    def _reserve(self, rows):
+        """Make room for `rows` more vectors, doubling the capacity of the store when full."""
+        needed = self.count + rows
+        if needed <= self._store.shape[0]:
+            return
+        capacity = max(needed, 2 * self._store.shape[0], 1024)
+        if self._db is None:
+            grown = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        else:
+            temporary = self.vectors_path + ".tmp"
+            grown = np.lib.format.open_memmap(temporary, mode="w+", dtype=np.float32, shape=(capacity, self.embedder.dim))
+        grown[:self.count] = self._store[:self.count]
+        if self._db is not None:
+            grown.flush()
+            del grown
+            os.replace(temporary, self.vectors_path)
+            grown = np.load(self.vectors_path, mmap_mode="r+")
+        self._store = grown
+
+    # ------------------------
+    # Public API
+    # ------------------------
+
+    def add_document(self, key, text):
+        """
+        Chunk, embed and store one document. Returns the number of chunks
+        added (0 if key is already indexed).
+        """
+        if key in self.documents:
+            return 0
+        spans = list(chunk_spans(text, self.chunk_words, self.overlap))
+        chunks = [text[start:end] for start, end in spans]
+
+        with self._lock:
+            if key in self.documents:
+                return 0
+            term_counts = [self.embedder.term_counts(chunk) for chunk in chunks]
+            for features, _ in term_counts:
+                self.document_frequency[features] += 1
+            self.chunks_seen += len(chunks)
+            vectors = self.embedder.embed_counts(term_counts, self._idf())
+
+            first = self.count
+            self._reserve(len(chunks))
+            self._store[first:first + len(chunks)] = vectors
+            for start, end in spans:
+                self.chunk_starts.append(start)
+                self.chunk_ends.append(end)
+            self.documents[key] = (first, len(chunks))
+            self.count += len(chunks)
+
+            if self._db is not None:
+                self._save_document(key, first, spans)
+        return len(chunks)
+
+    def _save_document(self, key, first, spans):
+        try:
+            if isinstance(self._store, np.memmap):
+                self._store.flush()
+            offsets = np.asarray(spans, dtype=np.int64).reshape(-1)
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                (key, first, len(spans), zlib.compress(offsets.tobytes())),
+            )
+            self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("count", str(self.count)),
+                ("chunks_seen", str(self.chunks_seen)),
+                ("document_frequency", zlib.compress(self.document_frequency.tobytes())),
+            ])
+            self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def search(self, query, k=6, documents=None):
+        """
+        Top k (document key, start, end, score) for query by cosine
+        similarity, best first. documents limits the search to those keys.
+        """
+        return self.search_many([query], k, documents)[0]
+
+    def search_many(self, queries, k=6, documents=None):
+        """search() for several queries at once: one matrix multiply per block of chunk rows."""
+        queries = self.embedder.embed(list(queries), self._idf())
+        vectors = self.vectors
+        if documents is None:
+            ranges = [(0, len(vectors))]
+        else:
+            ranges = sorted(
+                (first, first + chunks) for key, (first, chunks) in self.documents.items() if key in documents and chunks
+            )
+
+        best_rows = [np.zeros(0, dtype=np.int64)] * len(queries)
+        best_scores = [np.zeros(0, dtype=np.float32)] * len(queries)
+        for first, stop in ranges:
+            for block in range(first, stop, _SEARCH_BLOCK_ROWS):
+                block_stop = min(stop, block + _SEARCH_BLOCK_ROWS)
+                scores = queries @ vectors[block:block_stop].T     # (queries, rows)
+                top = min(k, scores.shape[1])
+                if not top:
+                    continue
+                candidates = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+                for index in range(len(queries)):
+                    best_rows[index] = np.concatenate([best_rows[index], candidates[index] + block])
+                    best_scores[index] = np.concatenate([best_scores[index], scores[index, candidates[index]]])
+
+        owners = sorted((first, key) for key, (first, _) in self.documents.items())
+        firsts = [first for first, _ in owners]
+        results = []
+        for rows, scores in zip(best_rows, best_scores):
+            order = np.argsort(-scores, kind="stable")[:k]
+            hits = []
+            for position in order:
+                if scores[position] <= 0:
+                    break
+                row = int(rows[position])
+                key = owners[np.searchsorted(firsts, row, side="right") - 1][1]
+                hits.append((key, self.chunk_starts[row], self.chunk_ends[row], float(scores[position])))
+            results.append(hits)
+        return results
+
+    def stats(self):
+        return {
+            "documents": len(self.documents),
+            "chunks": self.count,
+            "capacity": self._store.shape[0],
+            "bytes": self.count * self.embedder.dim * 4,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None